@@ -0,0 +1,44 @@
+"""Compare per-page extraction cost of the parsing backends.
+
+Usage: PYTHONPATH=src python benchmarks/bench_backends.py [pep.html ...]
+Without arguments synthetic PEP cards are used.
+"""
+import sys
+import time
+from pathlib import Path
+
+from bench_parsing import synthetic_page
+from constants import ParserBackend
+from extractors import parse_pep_status
+
+REPEATS = 20
+
+
+def measure(markup: str, backend: str) -> float:
+    """Return best time of extracting status from PEP card."""
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        parse_pep_status(markup, backend)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Print extraction time for every page and backend."""
+    pages = {
+        path: Path(path).read_text(encoding='utf-8') for path in sys.argv[1:]
+    } or {
+        f'synthetic-{size}': synthetic_page(size) for size in (100, 1000)
+    }
+    print(f'{"page":<24}{"backend":<10}{"time, ms":>10}')
+    for name, markup in pages.items():
+        for backend in ParserBackend:
+            print(
+                f'{name[-24:]:<24}{backend.value:<10}'
+                f'{measure(markup, backend) * 1000:>10.2f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Compare parsing of decoded text and raw bytes of responses.
+
+Usage: PYTHONPATH=src python benchmarks/bench_encoding.py [pep.html ...]
+Without arguments synthetic PEP cards are used. Every page is parsed
+as a string decoded from its body, as before, and as the body itself
+in its declared encoding.
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+from bench_parsing import synthetic_page
+from constants import RESPONSES_ENCODING, ParserBackend
+from extractors import parse_pep_status
+
+REPEATS = 20
+
+
+def parse_text(content: bytes, encoding: str, backend: str) -> str:
+    """Decode body of response to a string and parse it."""
+    return parse_pep_status(
+        str(content, encoding, errors='replace'), backend,
+    )
+
+
+def parse_bytes(content: bytes, encoding: str, backend: str) -> str:
+    """Parse body of response in its declared encoding."""
+    return parse_pep_status(content, backend, encoding)
+
+
+def measure(
+    parse: Callable[[bytes, str, str], str],
+    content: bytes,
+    backend: str,
+) -> Tuple[float, int]:
+    """Return best time and peak memory of extracting status."""
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        parse(content, RESPONSES_ENCODING, backend)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    parse(content, RESPONSES_ENCODING, backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> None:
+    """Print time and peak memory of both ways for every page."""
+    pages = {
+        path: Path(path).read_bytes() for path in sys.argv[1:]
+    } or {
+        f'synthetic-{size}': synthetic_page(size).encode(RESPONSES_ENCODING)
+        for size in (100, 1000)
+    }
+    print(
+        f'{"page":<24}{"backend":<10}{"input":<8}'
+        f'{"time, ms":>10}{"peak, KiB":>12}'
+    )
+    for name, content in pages.items():
+        for backend in ParserBackend:
+            assert parse_text(
+                content, RESPONSES_ENCODING, backend,
+            ) == parse_bytes(content, RESPONSES_ENCODING, backend)
+            for label, parse in (('text', parse_text), ('bytes', parse_bytes)):
+                best, peak = measure(parse, content, backend)
+                print(
+                    f'{name[-24:]:<24}{backend.value:<10}{label:<8}'
+                    f'{best * 1000:>10.2f}{peak / 1024:>12.0f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
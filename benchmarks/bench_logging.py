@@ -0,0 +1,107 @@
+"""Compare logging overhead of a failure-heavy run.
+
+Usage: PYTHONPATH=src python benchmarks/bench_logging.py [failures]
+
+Threads load pages which fail and search tags which aren't found,
+every failure is logged to a file and a console (/dev/null). Records
+are written by the crawling threads, as before, or by the background
+listener, with and without stack of the logging call.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import BaseAdapter
+
+from configs import StackInfoFilter, start_log_listener
+from constants import LOG_DT_FORMAT, LOG_FORMAT
+from utils import find_tag, get_response, parse_page
+
+THREADS = 8
+FAILURES = 2000
+PAGE = parse_page('<html><body><p>Empty</p></body></html>')
+
+
+class FailingAdapter(BaseAdapter):
+    """Fail every request without network."""
+
+    def send(self, request, **kwargs):
+        raise requests.ConnectionError(f'Нет соединения с {request.url}')
+
+
+def fail(session: requests.Session, number: int) -> None:
+    """Fail to load page and to find tag, both failures are logged."""
+    get_response(session, f'http://failing/{number}')
+    try:
+        find_tag(PAGE, 'table', {'class': 'docutils'})
+    except Exception:
+        pass
+
+
+def open_handlers(log_dir: str) -> List[logging.Handler]:
+    """Open file and console handlers like the parser does."""
+    handlers = [
+        RotatingFileHandler(
+            Path(log_dir) / 'parser.log', maxBytes=10**6, backupCount=5,
+        ),
+        logging.StreamHandler(open(os.devnull, 'w')),
+    ]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DT_FORMAT))
+    return handlers
+
+
+def measure(
+    background: bool, stack_level: Optional[str], failures: int,
+) -> Tuple[float, float]:
+    """Return time of the crawl and time until every record is written."""
+    session = requests.Session()
+    session.mount('http://failing/', FailingAdapter())
+    with tempfile.TemporaryDirectory() as log_dir:
+        handlers = open_handlers(log_dir)
+        listener = None
+        if background:
+            queue_handler, listener = start_log_listener(handlers, stack_level)
+            logging.root.handlers = [queue_handler]
+        else:
+            for handler in handlers:
+                handler.addFilter(StackInfoFilter(
+                    logging.getLevelName(stack_level),
+                ))
+            logging.root.handlers = handlers
+        start = time.perf_counter()
+        with ThreadPoolExecutor(THREADS) as executor:
+            list(executor.map(fail, [session] * failures, range(failures)))
+        crawl = time.perf_counter() - start
+        if listener is not None:
+            listener.stop()
+        written = time.perf_counter() - start
+        for handler in handlers:
+            handler.close()
+    logging.root.handlers = []
+    return crawl, written
+
+
+def main() -> None:
+    """Print crawl time and logging time of every way of logging."""
+    failures = int(sys.argv[1]) if len(sys.argv) > 1 else FAILURES
+    logging.root.setLevel(logging.INFO)
+    print(f'{"logging":<24}{"crawl, ms":>12}{"written, ms":>14}')
+    for name, background, stack_level in (
+        ('threads, stack', False, 'ERROR'),
+        ('listener, stack', True, 'ERROR'),
+        ('listener', True, None),
+    ):
+        crawl, written = measure(background, stack_level, failures)
+        print(f'{name:<24}{crawl * 1000:>12.0f}{written * 1000:>14.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Run every parser mode against the synthetic site and report metrics.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_modes.py \
+        [--peps 1000 10000] [--latency 20] [--modes pep whats-new] \
+        [--json results.json] [parser options, e.g. -w 32 -b lxml]
+
+Every mode runs in a separate process twice: with a cold and a warm
+in-memory responses cache. Wall time, requests per second, bytes
+transferred, parse time and peak RSS are printed and saved as JSON.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from urllib.parse import urljoin
+
+import requests
+
+from synthetic_site import STATS_PATH, SyntheticSite
+
+
+def site_stats(site_url: str) -> Dict[str, int]:
+    """Get requests and bytes served by the site so far."""
+    return requests.get(urljoin(site_url, STATS_PATH)).json()
+
+
+def time_parsing() -> Dict[str, float]:
+    """Wrap parse methods of backends to sum up the parse time."""
+    import backends
+
+    timings = {'parse': 0.0}
+    lock = threading.Lock()
+    for backend in backends.BACKENDS.values():
+        def timed_parse(*args, parse=backend.parse, **kwargs):
+            start = time.perf_counter()
+            try:
+                return parse(*args, **kwargs)
+            finally:
+                with lock:
+                    timings['parse'] += time.perf_counter() - start
+        backend.parse = timed_parse
+    return timings
+
+
+def run_mode(site_url: str, mode: str, parser_args: List[str]) -> None:
+    """
+    Run mode with cold and warm cache, print metrics as JSON.
+
+    Session is created the way the parser creates it, with rate limits,
+    timeouts and circuit breaker of the run, but with the memory cache.
+    """
+    import main
+    from cache import create_session
+    from configs import configure_argument_parser
+
+    main.MAIN_DOC_URL = urljoin(site_url, 'docs/3/')
+    main.WHATS_NEW_URL = urljoin(main.MAIN_DOC_URL, 'whatsnew/')
+    main.DOCS_DOWNLOAD_URL = urljoin(main.MAIN_DOC_URL, 'download.html')
+    main.PEP_URL = urljoin(site_url, 'peps/')
+    main.PEP_API_URL = urljoin(main.PEP_URL, 'api/peps.json')
+    main.BASE_DIR = Path(tempfile.mkdtemp())
+    timings = time_parsing()
+    args = configure_argument_parser(main.MODE_TO_FUNCTION.keys()).parse_args(
+        [mode, '--cache-backend', 'memory', *parser_args],
+    )
+    session = create_session(args)
+
+    metrics = {}
+    for run in ('cold', 'warm'):
+        timings['parse'] = 0.0
+        before = site_stats(site_url)
+        start = time.perf_counter()
+        main.MODE_TO_FUNCTION[mode](session, args)
+        seconds = time.perf_counter() - start
+        after = site_stats(site_url)
+        requests_made = after['requests'] - before['requests']
+        metrics[run] = {
+            'wall_seconds': round(seconds, 4),
+            'requests': requests_made,
+            'requests_per_second': round(requests_made / seconds, 1),
+            'bytes': after['bytes'] - before['bytes'],
+            'parse_seconds': round(timings['parse'], 4),
+        }
+    metrics['peak_rss_kib'] = resource.getrusage(
+        resource.RUSAGE_SELF,
+    ).ru_maxrss
+    print(json.dumps(metrics))
+
+
+def benchmark(
+    cli_args: argparse.Namespace, parser_args: List[str],
+) -> List[Dict[str, Any]]:
+    """Start site for every number of PEPs and run modes in subprocesses."""
+    results = []
+    for peps in cli_args.peps:
+        site = SyntheticSite(peps=peps, latency=cli_args.latency / 1000)
+        with site:
+            for mode in cli_args.modes:
+                process = subprocess.run(
+                    [sys.executable, __file__, '--child', site.url, mode,
+                     *parser_args],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    check=True,
+                    text=True,
+                )
+                results.append({
+                    'mode': mode,
+                    'peps': peps,
+                    'latency_ms': cli_args.latency,
+                    'parser_args': parser_args,
+                    **json.loads(process.stdout.splitlines()[-1]),
+                })
+    return results
+
+
+def main() -> None:
+    """Parse arguments, run benchmark and report metrics."""
+    if sys.argv[1:2] == ['--child']:
+        run_mode(sys.argv[2], sys.argv[3], sys.argv[4:])
+        return
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--peps', type=int, nargs='+', default=[1000])
+    parser.add_argument('--latency', type=float, default=0.0, help='ms')
+    parser.add_argument(
+        '--modes',
+        nargs='+',
+        default=['whats-new', 'latest-versions', 'download', 'pep'],
+    )
+    parser.add_argument('--json', type=Path, help='file for results')
+    cli_args, parser_args = parser.parse_known_args()
+
+    results = benchmark(cli_args, parser_args)
+    print(
+        f'{"mode":<16}{"peps":>7}{"cache":>6}{"wall, s":>9}{"req/s":>9}'
+        f'{"MiB":>8}{"parse, s":>10}{"RSS, MiB":>10}'
+    )
+    for result in results:
+        for run in ('cold', 'warm'):
+            metrics = result[run]
+            print(
+                f'{result["mode"]:<16}{result["peps"]:>7}{run:>6}'
+                f'{metrics["wall_seconds"]:>9.2f}'
+                f'{metrics["requests_per_second"]:>9.1f}'
+                f'{metrics["bytes"] / 2**20:>8.1f}'
+                f'{metrics["parse_seconds"]:>10.2f}'
+                f'{result["peak_rss_kib"] / 1024:>10.1f}'
+            )
+    if cli_args.json:
+        cli_args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
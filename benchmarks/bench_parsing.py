@@ -0,0 +1,74 @@
+"""Compare full and partial parsing of PEP cards and "What's new" pages.
+
+Usage: PYTHONPATH=src python benchmarks/bench_parsing.py [page.html ...]
+Without arguments synthetic pages similar to long PEPs are used.
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from constants import PARSING_MODULE
+from extractors import PEP_CARD_STRAINER, WHATS_NEW_STRAINER, get_strainer
+
+REPEATS = 5
+
+
+def synthetic_page(paragraphs: int) -> str:
+    """Build a page with PEP card header and a long body."""
+    header = (
+        '<h1>PEP 8 – Style Guide for Python Code</h1>'
+        '<dl class="rfc2822 field-list simple">'
+        '<dt>Author:</dt><dd>Guido van Rossum, Łukasz Langa</dd>'
+        '<dt>Status:</dt><dd><abbr title="Accepted">Active</abbr></dd>'
+        '</dl>'
+    )
+    body = ''.join(
+        f'<section id="s{number}"><h2>Section {number}</h2>'
+        f'<p>Text of paragraph <a href="#s{number}">{number}</a>, '
+        '<code>code</code> and <em>more</em> text.</p></section>'
+        for number in range(paragraphs)
+    )
+    return f'<html><body>{header}{body}</body></html>'
+
+
+def measure(markup: str, strainer=None):
+    """Return best parse time and peak memory of parsing markup."""
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        BeautifulSoup(markup, PARSING_MODULE, parse_only=strainer)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    soup = BeautifulSoup(markup, PARSING_MODULE, parse_only=strainer)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del soup
+    return best, peak
+
+
+def main() -> None:
+    """Print parse time and peak memory for every page and parse mode."""
+    pages = {
+        path: Path(path).read_text(encoding='utf-8') for path in sys.argv[1:]
+    } or {
+        f'synthetic-{size}': synthetic_page(size) for size in (100, 1000)
+    }
+    print(f'{"page":<24}{"parse":<10}{"time, ms":>10}{"peak, KiB":>12}')
+    for name, markup in pages.items():
+        for parse, strainer in (
+            ('full', None),
+            ('pep card', get_strainer(PEP_CARD_STRAINER)),
+            ('whats new', get_strainer(WHATS_NEW_STRAINER)),
+        ):
+            seconds, peak = measure(markup, strainer)
+            print(
+                f'{name[-24:]:<24}{parse:<10}'
+                f'{seconds * 1000:>10.2f}{peak / 1024:>12.0f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Report import time of the parser at startup.
+
+Usage: PYTHONPATH=src python benchmarks/bench_startup.py [repeats]
+
+`main.py --help` and a `latest-versions` run against the synthetic site
+are started with `-X importtime` several times. The best wall time of
+the process, the best total time of its imports and the modules slowest
+to import by themselves are printed.
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from synthetic_site import SyntheticSite
+
+REPEATS = 5
+SLOWEST_MODULES = 8
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+LATEST_VERSIONS_RUN = """
+import sys
+from argparse import Namespace
+from urllib.parse import urljoin
+
+import main
+from cache import create_session
+
+main.MAIN_DOC_URL = urljoin(sys.argv[1], 'docs/3/')
+session = create_session(Namespace(cache_backend='memory'))
+assert main.latest_versions(session)
+"""
+
+
+def run(command: List[str]) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Return wall time of command and own, cumulative µs of imports."""
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', *command],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+    imports = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        imports[name[1:].rstrip()] = int(own), int(cumulative)
+    return wall, imports
+
+
+def report(name: str, command: List[str], repeats: int) -> None:
+    """Print best of repeated runs of command."""
+    runs = [run(command) for _ in range(repeats)]
+    wall = min(wall for wall, _ in runs)
+    total = min(
+        sum(
+            cumulative for module, (_, cumulative) in imports.items()
+            if not module.startswith(' ')
+        )
+        for _, imports in runs
+    )
+    print(f'{name:<18}{wall * 1000:>10.0f}{total / 1000:>14.1f}')
+    _, imports = runs[-1]
+    slowest = sorted(
+        imports.items(), key=lambda item: item[1][0], reverse=True,
+    )[:SLOWEST_MODULES]
+    for module, (own, _) in slowest:
+        print(f'    {module.strip():<40}{own / 1000:>8.1f} ms')
+
+
+def main() -> None:
+    """Print startup metrics of --help and latest-versions."""
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else REPEATS
+    print(f'{"run":<18}{"wall, ms":>10}{"imports, ms":>14}')
+    report('--help', ['main.py', '--help'], repeats)
+    with SyntheticSite(peps=1, whats_new_pages=1) as site:
+        report(
+            'latest-versions',
+            ['-c', LATEST_VERSIONS_RUN, site.url],
+            repeats,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Synthetic docs and PEP site served from localhost.
+
+Pages look like the parts of docs.python.org and peps.python.org
+which the parser reads. The number of PEPs and the latency of every
+response are configurable, pages are generated once and kept in memory.
+"""
+import hashlib
+import json
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple, Union
+
+PEP_STATUSES = (
+    ('PA', 'Active'),
+    ('SF', 'Final'),
+    ('IR', 'Rejected'),
+    ('S', 'Draft'),
+    ('SD', 'Deferred'),
+    ('IW', 'Withdrawn'),
+    ('SA', 'Accepted'),
+    ('SS', 'Superseded'),
+    ('SP', 'Provisional'),
+    ('SF', 'Rejected'),  # mismatched status
+)
+STATS_PATH = '/__stats__'
+PARAGRAPH = (
+    '<p>Paragraph of text with <a href="#">links</a>, <code>code</code> '
+    'and <em>other</em> inline markup, as long PEPs have.</p>'
+)
+
+
+def pep_card(number: int, paragraphs: int) -> str:
+    """Build PEP card with the rfc2822 header and a long body."""
+    status = PEP_STATUSES[number % len(PEP_STATUSES)][1]
+    return (
+        f'<html><head><title>PEP {number}</title></head><body>'
+        f'<section id="pep-content"><h1>PEP {number} – Title</h1>'
+        '<dl class="rfc2822 field-list simple">'
+        '<dt class="field-odd">Author<span class="colon">:</span></dt>'
+        '<dd class="field-odd">Łukasz Langa, Guido van Rossum</dd>'
+        '<dt class="field-even">Status<span class="colon">:</span></dt>'
+        f'<dd class="field-even"><abbr title="...">{status}</abbr></dd>'
+        f'</dl>{PARAGRAPH * paragraphs}</section></body></html>'
+    )
+
+
+def pep_index(peps: int) -> str:
+    """Build numerical index table of PEPs."""
+    rows = ''.join(
+        '<tr class="row-odd">'
+        f'<td><abbr title="...">{PEP_STATUSES[number % 10][0]}</abbr></td>'
+        f'<td><a class="pep reference internal" href="pep-{number:04d}/">'
+        f'{number}</a></td><td>Title of PEP {number}</td>'
+        '<td>Author</td></tr>'
+        for number in range(peps)
+    )
+    return (
+        '<html><body><section id="numerical-index"><h2>Numerical Index</h2>'
+        '<table class="pep-zero-table docutils align-default"><thead><tr>'
+        '<th>Status</th><th>PEP</th><th>Title</th><th>Authors</th></tr>'
+        f'</thead><tbody>{rows}</tbody></table></section></body></html>'
+    )
+
+
+def pep_api(base_url: str, peps: int) -> str:
+    """Build structured PEP index."""
+    return json.dumps({
+        str(number): {
+            'number': number,
+            'title': f'Title of PEP {number}',
+            'status': PEP_STATUSES[number % len(PEP_STATUSES)][1],
+            'url': f'{base_url}peps/pep-{number:04d}/',
+        }
+        for number in range(peps)
+    })
+
+
+def docs_index() -> str:
+    """Build docs start page with the versions sidebar."""
+    versions = ''.join(
+        f'<li><a href="https://docs.python.org/3.{minor}/">'
+        f'Python 3.{minor} ({status})</a></li>'
+        for minor, status in (
+            (13, 'in development'), (12, 'stable'), (11, 'security-fixes'),
+        )
+    )
+    return (
+        '<html><body><div class="sphinxsidebar"><div '
+        'class="sphinxsidebarwrapper"><h3>Docs by version</h3>'
+        f'<ul>{versions}<li><a href="https://www.python.org/doc/versions/">'
+        'All versions</a></li></ul></div></div></body></html>'
+    )
+
+
+def whats_new_index(pages: int) -> str:
+    """Build "What's new" table of contents."""
+    items = ''.join(
+        f'<li class="toctree-l1"><a class="reference internal" '
+        f'href="3.{minor}.html">What’s New In Python 3.{minor}</a></li>'
+        for minor in range(pages)
+    )
+    return (
+        '<html><body><section id="what-s-new-in-python">'
+        '<h1>What’s New in Python</h1><div class="toctree-wrapper '
+        f'compound"><ul>{items}</ul></div></section></body></html>'
+    )
+
+
+def whats_new_page(minor: int, paragraphs: int) -> str:
+    """Build "What's new" article."""
+    return (
+        f'<html><body><section><h1>What’s New In Python 3.{minor}</h1>'
+        '<dl class="field-list simple">\n<dt>Editor<span>:</span></dt>\n'
+        f'<dd><p>Łukasz Langa {minor}</p>\n</dd>\n</dl>'
+        f'{PARAGRAPH * paragraphs}</section></body></html>'
+    )
+
+
+def download_page() -> str:
+    """Build docs download page."""
+    return (
+        '<html><body><table class="docutils align-default"><tr>'
+        '<td>PDF (A4 paper size)</td><td><a class="reference external" '
+        'href="archives/python-docs-pdf-a4.zip">Download</a></td>'
+        '<td><a href="archives/python-docs-pdf-letter.zip">Download</a>'
+        '</td></tr></table></body></html>'
+    )
+
+
+class SyntheticSite:
+    """Serve synthetic site on localhost counting requests and bytes."""
+
+    def __init__(
+        self,
+        peps: int = 1000,
+        whats_new_pages: int = 15,
+        paragraphs: int = 300,
+        archive_size: int = 2**20,
+        latency: float = 0.0,
+    ):
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/'
+        self.pages: Dict[str, Tuple[str, Union[str, bytes]]] = {
+            '/docs/3/': ('text/html', docs_index()),
+            '/docs/3/whatsnew/': ('text/html', whats_new_index(
+                whats_new_pages,
+            )),
+            '/docs/3/download.html': ('text/html', download_page()),
+            '/docs/3/archives/python-docs-pdf-a4.zip': (
+                'application/zip', bytes(archive_size),
+            ),
+            '/peps/': ('text/html', pep_index(peps)),
+            '/peps/api/peps.json': (
+                'application/json', pep_api(self.url, peps),
+            ),
+        }
+        for minor in range(whats_new_pages):
+            self.pages[f'/docs/3/whatsnew/3.{minor}.html'] = (
+                'text/html', whats_new_page(minor, paragraphs),
+            )
+        self.paragraphs = paragraphs
+        self.peps = peps
+
+    def page(self, path: str) -> Tuple[str, bytes]:
+        """Get content type and body of page, cards are built on demand."""
+        if path == STATS_PATH:
+            content_type, body = 'application/json', json.dumps({
+                'requests': self.requests, 'bytes': self.bytes_sent,
+            })
+        elif path in self.pages:
+            content_type, body = self.pages[path]
+        elif path.startswith('/peps/pep-') and path.endswith('/'):
+            number = int(path[len('/peps/pep-'):-1])
+            if number >= self.peps:
+                raise KeyError(path)
+            content_type = 'text/html'
+            body = pep_card(number, self.paragraphs)
+        else:
+            raise KeyError(path)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+            content_type += '; charset=utf-8'
+        return content_type, body
+
+    def handler(self):
+        """Build request handler class bound to the site."""
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_HEAD(self):
+                self.respond(send_body=False)
+
+            def do_GET(self):
+                self.respond(send_body=True)
+
+            def respond(self, send_body):
+                if site.latency:
+                    time.sleep(site.latency)
+                try:
+                    content_type, body = site.page(self.path)
+                except (KeyError, ValueError):
+                    self.send_error(HTTPStatus.NOT_FOUND)
+                    return
+                self.send_response(HTTPStatus.OK)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', f'"{hashlib.md5(body).hexdigest()}"')
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+                if self.path == STATS_PATH:
+                    return
+                with site.lock:
+                    site.requests += 1
+                    site.bytes_sent += len(body) if send_body else 0
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,180 @@
+"""Contain backends for parsing pages and searching tags.
+
+BeautifulSoup backend is the default one. Lxml backend works with
+lxml trees directly using compiled XPath queries. Parsing libraries
+are imported when the first page is parsed.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Pattern, Tuple, Union
+
+from constants import PARSING_MODULE, ParserBackend
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, SoupStrainer, Tag
+    from lxml import etree
+
+Node = Union['Tag', 'etree._Element']
+Attrs = Union[Dict[str, str], Dict[str, Pattern[str]], None]
+
+# bs4 matches class both as a single class and as the whole attribute
+CLASS_CONDITION = (
+    '(@class=${name} or contains('
+    "concat(' ', normalize-space(@class), ' '), concat(' ', ${name}, ' ')))"
+)
+ATTR_CONDITION = '@{attr}=${name}'
+
+
+class SoupBackend:
+    """Search tags in BeautifulSoup trees."""
+
+    def parse(
+        self,
+        markup: Union[str, bytes],
+        parse_only: Optional[SoupStrainer] = None,
+        encoding: Optional[str] = None,
+    ) -> BeautifulSoup:
+        """Build a tree, only parts matching parse_only if it's given."""
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(
+            markup,
+            PARSING_MODULE,
+            parse_only=parse_only,
+            from_encoding=encoding if isinstance(markup, bytes) else None,
+        )
+
+    def find(self, node: Tag, tag: str, attrs: Attrs = None) -> Optional[Tag]:
+        """Find first descendant tag matching attrs."""
+        return node.find(tag, attrs=(attrs or {}))
+
+    def find_all(self, node: Tag, tag: str, attrs: Attrs = None) -> List[Tag]:
+        """Find all descendant tags matching attrs."""
+        return node.find_all(tag, attrs=(attrs or {}))
+
+    def text(self, node: Tag) -> str:
+        """Get text of the tag and its descendants."""
+        return node.text
+
+    def attr(self, node: Tag, name: str) -> str:
+        """Get attribute value, KeyError if it's absent."""
+        return node[name]
+
+    def release(self, node: Tag) -> None:
+        """
+        Break references of the tree, so it's freed without gc.
+
+        Decomposing the soup itself doesn't reach its descendants.
+        """
+        for child in list(node.contents):
+            child.decompose()
+        node.decompose()
+
+
+class LxmlBackend:
+    """Search tags in lxml trees with compiled XPath queries."""
+
+    def parse(
+        self,
+        markup: Union[str, bytes],
+        parse_only: Optional[SoupStrainer] = None,
+        encoding: Optional[str] = None,
+    ) -> etree._Element:
+        """Build the whole tree, lxml parses it faster than a strainer."""
+        from lxml import etree, html
+
+        try:
+            return html.document_fromstring(
+                markup, parser=html.HTMLParser(encoding=encoding),
+            )
+        except etree.ParserError:
+            return html.Element('html')
+
+    def find(
+        self, node: etree._Element, tag: str, attrs: Attrs = None,
+    ) -> Optional[etree._Element]:
+        """Find first descendant tag matching attrs."""
+        for element in self.find_all(node, tag, attrs):
+            return element
+        return None
+
+    def find_all(
+        self, node: etree._Element, tag: str, attrs: Attrs = None,
+    ) -> List[etree._Element]:
+        """Find all descendant tags matching attrs."""
+        attrs = attrs or {}
+        patterns = {
+            attr: value for attr, value in attrs.items()
+            if not isinstance(value, str)
+        }
+        values = {
+            attr: value for attr, value in attrs.items()
+            if isinstance(value, str)
+        }
+        query = compile_query(
+            getattr(tag, 'value', tag),
+            tuple(sorted(values)),
+            tuple(sorted(patterns)),
+        )
+        elements = query(
+            node,
+            **{f'v{number}': values[attr]
+               for number, attr in enumerate(sorted(values))},
+        )
+        return [
+            element for element in elements
+            if all(
+                pattern.search(element.get(attr))
+                for attr, pattern in patterns.items()
+            )
+        ]
+
+    def text(self, node: etree._Element) -> str:
+        """Get text of the tag and its descendants."""
+        return str(node.text_content())
+
+    def attr(self, node: etree._Element, name: str) -> str:
+        """Get attribute value, KeyError if it's absent."""
+        return node.attrib[name]
+
+    def release(self, node: etree._Element) -> None:
+        """Drop descendants of the tree at once."""
+        node.clear()
+
+
+@lru_cache(maxsize=None)
+def compile_query(
+    tag: str, value_attrs: Tuple[str, ...], pattern_attrs: Tuple[str, ...],
+) -> etree.XPath:
+    """Compile XPath query for a tag with attributes.
+
+    Attribute values are passed as XPath variables,
+    so a query is compiled once for every tag and set of attributes.
+    """
+    from lxml import etree
+
+    conditions = [
+        (CLASS_CONDITION if attr == 'class' else ATTR_CONDITION).format(
+            attr=attr, name=f'v{number}',
+        )
+        for number, attr in enumerate(value_attrs)
+    ]
+    conditions += [f'@{attr}' for attr in pattern_attrs]
+    predicate = ''.join(f'[{condition}]' for condition in conditions)
+    return etree.XPath(f'descendant::{tag}{predicate}')
+
+
+BACKENDS = {
+    ParserBackend.SOUP: SoupBackend(),
+    ParserBackend.LXML: LxmlBackend(),
+}
+
+
+def get_backend(node: Node) -> Union[SoupBackend, LxmlBackend]:
+    """Get backend which has built the tree of node."""
+    from lxml import etree
+
+    if isinstance(node, etree._Element):
+        return BACKENDS[ParserBackend.LXML]
+    return BACKENDS[ParserBackend.SOUP]
@@ -0,0 +1,234 @@
+"""Contain cache of responses for the parser run.
+
+Persistent backends compress serialized responses and evict the least
+recently used ones when the cache grows beyond the size limit.
+Access times are kept in memory during the run and written once
+at eviction, so cache reads stay as cheap as without eviction.
+"""
+import logging
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from requests import Response
+from requests_cache import CachedResponse, CachedSession
+from requests_cache.backends import FileCache, SQLiteCache
+from requests_cache.serializers import (SerializerPipeline, Stage,
+                                        pickle_serializer)
+
+from constants import (CACHE_COMPRESSION_LEVEL, CACHE_NAME,
+                       CACHE_URLS_EXPIRE_AFTER, DEFAULT_BREAKER_THRESHOLD,
+                       DEFAULT_CACHE_EXPIRE_AFTER, DEFAULT_CACHE_MAX_SIZE,
+                       DEFAULT_CONNECT_TIMEOUT, DEFAULT_RATE_LIMIT,
+                       DEFAULT_READ_TIMEOUT, DEFAULT_RETRIES, DEFAULT_WORKERS,
+                       CacheBackend)
+from throttling import ThrottledAdapter
+
+ZLIB_HEADER = b'x'
+LRU_TABLE = 'lru_access'
+CACHE_FILE_EXTENSION = 'zpkl'
+
+Entry = Tuple[str, int, float]  # key, size and last access time
+
+
+def decompress(data: bytes) -> bytes:
+    """Decompress data, responses cached before compression are kept."""
+    if data[:1] != ZLIB_HEADER:
+        return data
+    return zlib.decompress(data)
+
+
+compressed_serializer = SerializerPipeline(
+    [
+        *pickle_serializer.stages,
+        Stage(
+            dumps=partial(zlib.compress, level=CACHE_COMPRESSION_LEVEL),
+            loads=decompress,
+        ),
+    ],
+    name='pickle-zlib',
+    is_binary=True,
+)
+
+
+class LRUCacheMixin(ABC):
+    """Track access to responses and evict least recently used ones."""
+
+    def __init__(self, *args: Any, max_size: int = 0, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_size = max_size
+        self.accessed: Dict[str, float] = {}
+        self.accessed_lock = threading.Lock()
+
+    def touch(self, key: str) -> None:
+        """Remember access to the response."""
+        with self.accessed_lock:
+            self.accessed[key] = time.time()
+
+    def get_response(
+        self, key: str, default: Any = None,
+    ) -> Optional[CachedResponse]:
+        """Get response from cache and remember access to it."""
+        response = super().get_response(key, default)
+        if response is not default:
+            self.touch(key)
+        return response
+
+    def save_response(
+        self, response: Response, cache_key: Optional[str] = None,
+        *args: Any, **kwargs: Any,
+    ) -> None:
+        """Save response to cache and remember access to it."""
+        cache_key = cache_key or self.create_key(response.request)
+        super().save_response(response, cache_key, *args, **kwargs)
+        self.touch(cache_key)
+
+    def evict(self) -> int:
+        """Evict least recently used responses beyond the size limit."""
+        with self.accessed_lock:
+            accessed, self.accessed = self.accessed, {}
+        self.flush_access(accessed)
+        if not self.max_size:
+            return 0
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+        for key, size, _ in entries:
+            if total <= self.max_size:
+                break
+            evicted.append(key)
+            total -= size
+        if evicted:
+            self.remove(evicted)
+            logging.info(f'Из кеша вытеснено ответов: {len(evicted)}')
+        return len(evicted)
+
+    @abstractmethod
+    def flush_access(self, accessed: Dict[str, float]) -> None:
+        """Store access times remembered during the run."""
+
+    @abstractmethod
+    def entries(self) -> Iterable[Entry]:
+        """Get size and last access time of every cached response."""
+
+    def remove(self, keys: List[str]) -> None:
+        """Remove responses from cache."""
+        self.responses.bulk_delete(keys)
+
+
+class LRUSQLiteCache(LRUCacheMixin, SQLiteCache):
+    """SQLite cache with access times in a separate table."""
+
+    def flush_access(self, accessed: Dict[str, float]) -> None:
+        """Store access times with a single transaction."""
+        with self.responses.connection(commit=True) as connection:
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {LRU_TABLE} '
+                '(key TEXT PRIMARY KEY, accessed REAL)',
+            )
+            connection.executemany(
+                f'INSERT OR REPLACE INTO {LRU_TABLE} VALUES (?, ?)',
+                accessed.items(),
+            )
+
+    def entries(self) -> Iterable[Entry]:
+        """Get sizes of values, never accessed responses go first."""
+        with self.responses.connection() as connection:
+            return connection.execute(
+                'SELECT responses.key, length(responses.value), '
+                f'COALESCE({LRU_TABLE}.accessed, 0) FROM responses '
+                f'LEFT JOIN {LRU_TABLE} ON {LRU_TABLE}.key = responses.key',
+            ).fetchall()
+
+    def remove(self, keys: List[str]) -> None:
+        """Remove responses and access times of absent responses."""
+        super().remove(keys)
+        with self.responses.connection(commit=True) as connection:
+            connection.execute(
+                f'DELETE FROM {LRU_TABLE} '
+                'WHERE key NOT IN (SELECT key FROM responses)',
+            )
+
+
+class LRUFileCache(LRUCacheMixin, FileCache):
+    """Filesystem cache with access times as modification times."""
+
+    def flush_access(self, accessed: Dict[str, float]) -> None:
+        """Set modification times of files."""
+        for key, accessed_at in accessed.items():
+            with suppress(OSError):
+                os.utime(
+                    self.responses.cache_dir
+                    / f'{key}{self.responses.extension}',
+                    (accessed_at, accessed_at),
+                )
+
+    def entries(self) -> Iterable[Entry]:
+        """Get sizes and modification times of files."""
+        entries = []
+        for path in self.responses.paths():
+            with suppress(OSError):
+                stat = path.stat()
+                entries.append((path.stem, stat.st_size, stat.st_mtime))
+        return entries
+
+
+def create_session(cli_args: Any = None) -> CachedSession:
+    """
+    Create session with the cache backend and limits of the run.
+
+    Stale cached response is used if the page can't be loaded again.
+    """
+    backend = getattr(cli_args, 'cache_backend', CacheBackend.SQLITE)
+    max_size = getattr(
+        cli_args, 'cache_max_size', DEFAULT_CACHE_MAX_SIZE,
+    ) * 2**20
+    cache: Any = CacheBackend.MEMORY.value
+    if backend == CacheBackend.SQLITE:
+        cache = LRUSQLiteCache(
+            CACHE_NAME,
+            serializer=compressed_serializer,
+            wal=True,
+            max_size=max_size,
+        )
+    elif backend == CacheBackend.FILESYSTEM:
+        cache = LRUFileCache(
+            CACHE_NAME,
+            serializer=compressed_serializer,
+            extension=CACHE_FILE_EXTENSION,
+            max_size=max_size,
+        )
+    session = CachedSession(
+        backend=cache,
+        expire_after=DEFAULT_CACHE_EXPIRE_AFTER,
+        urls_expire_after=CACHE_URLS_EXPIRE_AFTER,
+        stale_if_error=True,
+    )
+    workers = getattr(cli_args, 'workers', DEFAULT_WORKERS)
+    adapter = ThrottledAdapter(
+        rate=getattr(cli_args, 'rate_limit', DEFAULT_RATE_LIMIT),
+        concurrency=workers,
+        retries=getattr(cli_args, 'retries', DEFAULT_RETRIES),
+        timeout=(
+            getattr(cli_args, 'connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+            getattr(cli_args, 'read_timeout', DEFAULT_READ_TIMEOUT),
+        ),
+        breaker_threshold=getattr(
+            cli_args, 'breaker_threshold', DEFAULT_BREAKER_THRESHOLD,
+        ),
+        pool_maxsize=workers,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def evict_cache(session: CachedSession) -> None:
+    """Evict least recently used responses if the backend supports it."""
+    if isinstance(session.cache, LRUCacheMixin):
+        session.cache.evict()
@@ -1,10 +1,68 @@
 """Contains configs for logging and commannd line parsing."""
 import argparse
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
-from typing import Any
+import os
+import sys
+import traceback
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from typing import Any, Optional, Sequence, Tuple
 
-from constants import BASE_DIR, LOG_DT_FORMAT, LOG_FORMAT, OutputMode
+from constants import (BASE_DIR, DEFAULT_BREAKER_THRESHOLD,
+                       DEFAULT_CACHE_MAX_SIZE, DEFAULT_CHECKPOINT_INTERVAL,
+                       DEFAULT_CONNECT_TIMEOUT, DEFAULT_PARSE_WORKERS,
+                       DEFAULT_RATE_LIMIT, DEFAULT_READ_TIMEOUT,
+                       DEFAULT_RETRIES, DEFAULT_WORKERS, LOG_DT_FORMAT,
+                       LOG_FORMAT, LOG_LEVELS, CacheBackend, OutputMode,
+                       ParserBackend, PepSource)
+
+LOGGING_DIR = os.path.dirname(logging.__file__)  # frames skipped in stacks
+
+
+def positive_int(value: str) -> int:
+    """Convert command line value to a positive integer."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            f'Ожидается положительное число, получено {value}',
+        )
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """Convert command line value to a non-negative integer."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(
+            f'Ожидается неотрицательное число, получено {value}',
+        )
+    return number
+
+
+def positive_float(value: str) -> float:
+    """Convert command line value to a positive number."""
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(
+            f'Ожидается положительное число, получено {value}',
+        )
+    return number
+
+
+def shard(value: str) -> Tuple[int, int]:
+    """Convert command line value i/N to number and quantity of shards."""
+    try:
+        index, count = map(int, value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f'Ожидается шард в виде i/N, получено {value}',
+        )
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            f'Номер шарда должен быть от 1 до N, получено {value}',
+        )
+    return index, count
 
 
 def configure_argument_parser(available_modes: Any) -> argparse.ArgumentParser:
@@ -12,26 +70,233 @@ def configure_argument_parser(available_modes: Any) -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description='Парсер документации Python')
     parser.add_argument(
         'mode',
+        nargs='+',
         choices=available_modes,
         help='Режимы работы парсера',
     )
+    parser.add_argument(
+        '--parallel-modes',
+        action='store_true',
+        help='Одновременный запуск нескольких режимов',
+    )
     parser.add_argument(
         '-c',
         '--clear-cache',
         action='store_true',
         help='Очистка кеша',
     )
+    parser.add_argument(
+        '--cache-backend',
+        choices=tuple(CacheBackend),
+        default=CacheBackend.SQLITE,
+        help='Хранилище кеша ответов',
+    )
+    parser.add_argument(
+        '--cache-max-size',
+        type=positive_int,
+        default=DEFAULT_CACHE_MAX_SIZE,
+        help='Максимальный размер кеша ответов в МиБ',
+    )
+    parser.add_argument(
+        '--no-extraction-cache',
+        dest='extraction_cache',
+        action='store_false',
+        help='Разбирать страницы заново, не используя сохранённые значения',
+    )
     parser.add_argument(
         '-o',
         '--output',
         choices=tuple(OutputMode),
         help='Дополнительные способы вывода данных',
     )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=positive_int,
+        default=DEFAULT_WORKERS,
+        help='Количество параллельных загрузок страниц',
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=positive_float,
+        default=DEFAULT_RATE_LIMIT,
+        help='Наибольшее число запросов в секунду к одному сайту',
+    )
+    parser.add_argument(
+        '--retries',
+        type=non_negative_int,
+        default=DEFAULT_RETRIES,
+        help='Количество повторов запросов, ограниченных сервером',
+    )
+    parser.add_argument(
+        '--connect-timeout',
+        type=positive_float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help='Время ожидания соединения с сайтом в секундах',
+    )
+    parser.add_argument(
+        '--read-timeout',
+        type=positive_float,
+        default=DEFAULT_READ_TIMEOUT,
+        help='Время ожидания ответа сайта в секундах',
+    )
+    parser.add_argument(
+        '--breaker-threshold',
+        type=positive_int,
+        default=DEFAULT_BREAKER_THRESHOLD,
+        help='Количество ошибок подряд, после которого запросы '
+             'к сайту приостанавливаются',
+    )
+    parser.add_argument(
+        '-p',
+        '--parse-workers',
+        type=positive_int,
+        default=DEFAULT_PARSE_WORKERS,
+        help='Количество процессов для разбора страниц',
+    )
+    parser.add_argument(
+        '-s',
+        '--source',
+        choices=tuple(PepSource),
+        default=PepSource.CARDS,
+        help='Источник статусов PEP',
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Разбирать заново только изменившиеся карточки PEP',
+    )
+    parser.add_argument(
+        '--stream-cards',
+        action='store_true',
+        help='Читать карточки PEP только до статуса, не загружая целиком',
+    )
+    parser.add_argument(
+        '--shard',
+        type=shard,
+        help='Разбирать только i-ю из N частей индекса PEP '
+             'и сохранить частичный результат для merge',
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Продолжить прерванный обход с контрольной точки',
+    )
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=positive_int,
+        default=DEFAULT_CHECKPOINT_INTERVAL,
+        help='Количество страниц между сохранениями контрольной точки',
+    )
+    parser.add_argument(
+        '-b',
+        '--backend',
+        choices=tuple(ParserBackend),
+        default=ParserBackend.SOUP,
+        help='Способ разбора страниц',
+    )
+    parser.add_argument(
+        '--log-stack-level',
+        choices=LOG_LEVELS,
+        help='Уровень записей журнала, к которым добавляется стек вызова',
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Вывод времени этапов работы и счётчиков запросов',
+    )
+    parser.add_argument(
+        '--profile-json',
+        action='store_true',
+        help='Сохранение профиля работы в JSON-файл рядом с результатами',
+    )
     return parser
 
 
-def configure_logging() -> None:
-    """Describe configure for argument parser."""
+class StackInfoFilter(logging.Filter):
+    """Add stack of the logging call to records of the level and above."""
+
+    def __init__(self, level: Optional[int] = None) -> None:
+        super().__init__()
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Capture stack of the caller, frames of logging are skipped.
+
+        Records of worker processes are passed without stack.
+        """
+        if (
+            self.level is None
+            or record.levelno < self.level
+            or record.stack_info is not None
+            or record.process != os.getpid()
+        ):
+            return True
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_code.co_filename.startswith(
+            LOGGING_DIR,
+        ):
+            frame = frame.f_back
+        record.stack_info = 'Stack (most recent call last):\n' + ''.join(
+            traceback.format_stack(frame),
+        ).rstrip('\n')
+        return True
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """Put records to the queue, they are formatted by the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Keep record as is, only its message is built."""
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def start_log_listener(
+    handlers: Sequence[logging.Handler], stack_level: Optional[str] = None,
+) -> Tuple[QueueHandler, QueueListener]:
+    """
+    Start thread writing records to handlers, give handler of its queue.
+
+    Logging calls only put records to the queue, so the threads loading
+    pages don't wait for writing to the file and console.
+    """
+    log_queue: SimpleQueue[logging.LogRecord] = SimpleQueue()
+    queue_handler = BackgroundQueueHandler(log_queue)
+    queue_handler.addFilter(StackInfoFilter(
+        None if stack_level is None else logging.getLevelName(stack_level),
+    ))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return queue_handler, listener
+
+
+class ForwardHandler(logging.Handler):
+    """Pass records of worker processes to loggers of this process."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Handle record with the logger it was logged with."""
+        logging.getLogger(record.name).handle(record)
+
+
+def configure_worker_logging(log_queue: Any, level: int) -> None:
+    """Send records of worker process to the queue of the main process."""
+    logging.root.handlers = [QueueHandler(log_queue)]
+    logging.root.setLevel(level)
+
+
+def configure_logging(stack_level: Optional[str] = None) -> None:
+    """
+    Describe configure for logging.
+
+    Records are written by a background thread, which writes the records
+    left when the interpreter exits. Stack of the logging call is added
+    to records of stack_level and above.
+    """
+    if logging.root.handlers:
+        return
     log_dir = BASE_DIR / 'logs'
     log_dir.mkdir(exist_ok=True)
     log_file = log_dir / 'parser.log'
@@ -41,10 +306,10 @@ def configure_logging() -> None:
         maxBytes=10**6,
         backupCount=5,
     )
+    handlers = (rotating_handler, logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DT_FORMAT))
 
-    logging.basicConfig(
-        datefmt=LOG_DT_FORMAT,
-        format=LOG_FORMAT,
-        level=logging.INFO,
-        handlers=(rotating_handler, logging.StreamHandler()),
-    )
+    queue_handler, listener = start_log_listener(handlers, stack_level)
+    atexit.register(listener.stop)
+    logging.basicConfig(level=logging.INFO, handlers=(queue_handler,))
@@ -1,5 +1,7 @@
 """Contain constants for bs4 parser app."""
+from datetime import timedelta
 from enum import Enum
+from http import HTTPStatus
 from pathlib import Path
 from urllib.parse import urljoin
 
@@ -7,18 +9,57 @@ MAIN_DOC_URL = 'https://docs.python.org/3/'
 WHATS_NEW_URL = urljoin(MAIN_DOC_URL, 'whatsnew/')
 DOCS_DOWNLOAD_URL = urljoin(MAIN_DOC_URL, 'download.html')
 PEP_URL = 'https://peps.python.org/'
+PEP_API_URL = urljoin(PEP_URL, 'api/peps.json')
+PEP_NUMBER_PATTERN = r'pep-(\d+)/?$'  # number of PEP in link on its card
 
 BASE_DIR = Path(__file__).parent
 DATETIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
 LOG_FORMAT = '"%(asctime)s - [%(levelname)s] - %(message)s"'
 LOG_DT_FORMAT = '%d.%m.%Y %H:%M:%S'
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')  # may get stack
 
 PARSING_MODULE = 'lxml'
 DOWNLOAD_FILE_NAME_PATTERN = r'.+pdf-a4\.zip$'
+DOWNLOAD_CHUNK_SIZE = 2**16
+PARSE_CHUNK_SIZE = 2**12  # bytes of page fed to parser between reads
+CARD_CHUNK_SIZE = 2**12  # bytes of streamed PEP card read at once
+DIGEST_ALGORITHMS = {
+    'md5': 'md5',
+    'sha': 'sha1',
+    'sha-256': 'sha256',
+    'sha-512': 'sha512',
+}  # Digest header names and hashlib algorithms
 VERSION_STATUS_PATTERN = (
     r'Python (?P<version>\d\.\d+) \((?P<status>.*)\)'
 )  # version and status pattern for latest version mode
 RESPONSES_ENCODING = 'utf-8'
+CHARSET_PATTERN = r'charset=["\']?([\w.:-]+)'  # charset of Content-Type
+DEFAULT_WORKERS = 8  # parallel page loads for modes crawling many pages
+DEFAULT_PARSE_WORKERS = 1  # pages are parsed in the main process
+PROCESS_START_METHODS = ('forkserver', 'spawn')  # parse workers aren't forked
+DEFAULT_CHECKPOINT_INTERVAL = 50  # pages between saves of crawl progress
+DEFAULT_RATE_LIMIT = 100.0  # requests per second to every host
+DEFAULT_RETRIES = 5  # retries of requests throttled by server
+DEFAULT_CONNECT_TIMEOUT = 5.0  # seconds
+DEFAULT_READ_TIMEOUT = 30.0  # seconds
+DEFAULT_BREAKER_THRESHOLD = 5  # failed requests in a row to stop a host
+BREAKER_RESET_TIMEOUT = 30.0  # seconds before a trial request
+THROTTLE_STATUSES = (
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+)
+
+CACHE_NAME = 'http_cache'
+EXTRACTION_CACHE_NAME = 'extracted.sqlite'
+DEFAULT_CACHE_MAX_SIZE = 512  # MiB
+CACHE_COMPRESSION_LEVEL = 6
+DEFAULT_CACHE_EXPIRE_AFTER = timedelta(days=1)
+CACHE_URLS_EXPIRE_AFTER = {
+    urljoin(PEP_URL, 'pep-*'): timedelta(days=7),
+    PEP_URL: timedelta(hours=1),
+    urljoin(WHATS_NEW_URL, '3.*'): timedelta(days=90),
+    MAIN_DOC_URL: timedelta(days=1),
+}  # first matching pattern wins, cards change rarely, index often
 
 EXPECTED_STATUS = {
     'A': ('Active', 'Accepted'),
@@ -30,6 +71,11 @@ EXPECTED_STATUS = {
     'W': ('Withdrawn',),
     '': ('Draft', 'Active'),
 }
+ALL_MODES = 'all'  # runs every mode in one process
+MERGE_MODE = 'merge'  # combines partial results of sharded pep runs
+SHARD_FILE_NAME = 'pep_shard_{index}_of_{count}.json'  # in results dir
+SHARD_FILES_PATTERN = 'pep_shard_*_of_*.json'
+PEP_MISMATCHES_TITLE = 'Несовпадающие статусы:'
 
 
 class HTMLTags(str, Enum):
@@ -53,3 +99,28 @@ class OutputMode(str, Enum):
 
     PRETTY = 'pretty'
     FILE = 'file'
+    GZIP = 'gzip'
+    JSONL = 'jsonl'
+    SQLITE = 'sqlite'
+
+
+class PepSource(str, Enum):
+    """Contains sources of PEP statuses."""
+
+    CARDS = 'cards'
+    INDEX = 'index'
+
+
+class CacheBackend(str, Enum):
+    """Contains backends for caching responses."""
+
+    SQLITE = 'sqlite'
+    FILESYSTEM = 'filesystem'
+    MEMORY = 'memory'
+
+
+class ParserBackend(str, Enum):
+    """Contains backends for parsing pages."""
+
+    SOUP = 'soup'
+    LXML = 'lxml'
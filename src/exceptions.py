@@ -1,7 +1,14 @@
 """Contain constants for bs4 parser app."""
+from requests import ConnectionError
 
 
 class ParserFindTagException(Exception):
     """Exeption if Tag hasn't been found."""
 
     pass
+
+
+class CircuitOpenError(ConnectionError):
+    """Exeption if requests to the host are stopped after failures."""
+
+    pass
@@ -0,0 +1,195 @@
+"""Contain functions extracting values from single pages.
+
+Only the part of a page which is needed is parsed.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import (TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional,
+                    Tuple, Union)
+
+from constants import HTMLTags, ParserBackend
+from utils import (find_tag, get_attr, get_text, iter_page_events, parse_page,
+                   release_element, release_tree, tag_not_found)
+
+if TYPE_CHECKING:
+    from bs4 import SoupStrainer
+    from lxml import etree
+
+Page = Tuple[bytes, str]  # body and encoding of response
+CachedPage = Tuple[bool, Any]  # found value or page for extraction
+
+EXTRACTION_VERSION = 1  # increase when extracted values change
+
+PEP_INDEX_ATTRS = {'id': 'numerical-index'}
+PEP_CARD_HEADER_ATTRS = {'class': 'rfc2822 field-list simple'}
+PEP_CARD_STRAINER = 'pep_card'
+WHATS_NEW_STRAINER = 'whats_new'
+WHATS_NEW_INDEX_ATTRS = {'id': 'what-s-new-in-python'}
+WHATS_NEW_INDEX_STRAINER = 'whats_new_index'
+STRAINERS = {
+    PEP_CARD_STRAINER: (HTMLTags.DL, PEP_CARD_HEADER_ATTRS),
+    WHATS_NEW_STRAINER: ([HTMLTags.H1, HTMLTags.DL], {}),
+    WHATS_NEW_INDEX_STRAINER: (HTMLTags.SECTION, WHATS_NEW_INDEX_ATTRS),
+}  # tags and attributes of parts of pages which are parsed
+
+
+@lru_cache(maxsize=None)
+def get_strainer(
+    name: str, backend: str = ParserBackend.SOUP,
+) -> Optional[SoupStrainer]:
+    """
+    Build strainer of the part of page on first use.
+
+    Lxml backend parses whole pages, it needs neither strainer nor bs4.
+    """
+    if backend != ParserBackend.SOUP:
+        return None
+    from bs4 import SoupStrainer
+
+    tags, attrs = STRAINERS[name]
+    return SoupStrainer(tags, attrs=attrs)
+
+
+def parse_pep_status(
+    markup: Union[str, bytes],
+    backend: str = ParserBackend.SOUP,
+    encoding: Optional[str] = None,
+) -> str:
+    """Get status from the header of PEP card."""
+    soup = parse_page(
+        markup, backend, get_strainer(PEP_CARD_STRAINER, backend), encoding,
+    )
+    dl_tag = find_tag(soup, HTMLTags.DL, attrs=PEP_CARD_HEADER_ATTRS)
+    status_tag = find_tag(dl_tag, HTMLTags.ABBR)
+    status = get_text(status_tag)
+    release_tree(soup)
+    return status
+
+
+def parse_whats_new_page(
+    markup: Union[str, bytes],
+    backend: str = ParserBackend.SOUP,
+    encoding: Optional[str] = None,
+) -> Tuple[str, str]:
+    """Get title and editors from "What's new" article."""
+    soup = parse_page(
+        markup, backend, get_strainer(WHATS_NEW_STRAINER, backend), encoding,
+    )
+    h1 = find_tag(soup, HTMLTags.H1)
+    dl = find_tag(soup, HTMLTags.DL)
+    page = get_text(h1), get_text(dl).replace('\n', ' ')
+    release_tree(soup)
+    return page
+
+
+def has_class(element: etree._Element, value: str) -> bool:
+    """Match class as bs4 does, as the whole attribute or a single class."""
+    classes = element.get('class', '')
+    return classes == value or value in classes.split()
+
+
+def read_pep_status(
+    content: Union[bytes, Iterable[bytes]], encoding: Optional[str] = None,
+) -> str:
+    """
+    Get status from the header of PEP card as soon as it's parsed.
+
+    Chunks of a streamed card are parsed only up to the status,
+    the rest of the card isn't read.
+    """
+    header = None
+    for event, element in iter_page_events(content, encoding):
+        if event == 'start':
+            if (
+                header is None
+                and element.tag == HTMLTags.DL
+                and has_class(element, PEP_CARD_HEADER_ATTRS['class'])
+            ):
+                header = element
+            continue
+        if header is not None and element.tag == HTMLTags.ABBR:
+            return get_text(element)
+        if element is header:
+            break
+    if header is None:
+        raise tag_not_found(HTMLTags.DL, PEP_CARD_HEADER_ATTRS)
+    raise tag_not_found(HTMLTags.ABBR)
+
+
+def is_pep_index(element: etree._Element) -> bool:
+    """Check whether element is the section of PEP numerical index."""
+    return (
+        element.tag == HTMLTags.SECTION
+        and element.get('id') == PEP_INDEX_ATTRS['id']
+    )
+
+
+def iter_pep_index(
+    content: bytes, encoding: Optional[str] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Yield link and status letters of every row of PEP numerical index.
+
+    Index is parsed by chunks and rows are dropped as soon as they are
+    read, so the tree of the whole index is never built. Parsing stops
+    at the end of the table.
+    """
+    section = tbody = None
+    for event, element in iter_page_events(content, encoding):
+        if event == 'start':
+            if section is None and is_pep_index(element):
+                section = element
+            elif (
+                section is not None
+                and tbody is None
+                and element.tag == HTMLTags.TBODY
+            ):
+                tbody = element
+            continue
+        if element is tbody:
+            return
+        if element is section:
+            break
+        if element.tag == HTMLTags.TR:
+            if tbody is not None:
+                yield (
+                    get_attr(find_tag(element, HTMLTags.A), 'href'),
+                    get_text(find_tag(element, HTMLTags.ABBR))[1:],
+                )
+            release_element(element)
+    if section is None:
+        raise tag_not_found(HTMLTags.SECTION, PEP_INDEX_ATTRS)
+    raise tag_not_found(HTMLTags.TBODY)
+
+
+def extract_pep_status(
+    page: Optional[Page], backend: str = ParserBackend.SOUP,
+) -> Optional[str]:
+    """Get status from raw PEP card, None if card hasn't been loaded."""
+    if page is None:
+        return None
+    content, encoding = page
+    return parse_pep_status(content, backend, encoding)
+
+
+def extract_whats_new_page(
+    page: Optional[Page], backend: str = ParserBackend.SOUP,
+) -> Optional[Tuple[str, str]]:
+    """Get title and editors from raw article, None if it isn't loaded."""
+    if page is None:
+        return None
+    content, encoding = page
+    return parse_whats_new_page(content, backend, encoding)
+
+
+def extract_cached(
+    extractor: Callable[[Optional[Page], str], Any],
+    item: CachedPage,
+    backend: str = ParserBackend.SOUP,
+) -> Any:
+    """Get value found in the extraction cache or extract it from page."""
+    found, value = item
+    if found:
+        return value
+    return extractor(value, backend)
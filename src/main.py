@@ -1,24 +1,155 @@
-"""Describe main functions of bs4 app."""
+"""Describe main functions of bs4 app.
+
+Only light modules are imported at start, parsing and network
+libraries are imported by the first mode which uses them.
+"""
+from __future__ import annotations
+
 import logging
 import re
-from typing import List, Optional, Sequence, Tuple, Union
+from argparse import Namespace
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from itertools import islice, tee
+from threading import Lock
+from typing import (TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable,
+                    Iterator, List, Mapping, Optional, Sequence, Tuple,
+                    TypeVar, Union)
 from urllib.parse import urljoin
 
-import requests_cache
-from bs4 import BeautifulSoup
-from requests_cache import CachedSession
-from tqdm import tqdm
-
 from configs import configure_argument_parser, configure_logging
-from constants import (BASE_DIR, DOCS_DOWNLOAD_URL, DOWNLOAD_FILE_NAME_PATTERN,
-                       EXPECTED_STATUS, MAIN_DOC_URL, PARSING_MODULE, PEP_URL,
-                       VERSION_STATUS_PATTERN, WHATS_NEW_URL, HTMLTags)
-from outputs import control_output
-from utils import find_tag, get_response
+from constants import (ALL_MODES, BASE_DIR, CARD_CHUNK_SIZE,
+                       DEFAULT_PARSE_WORKERS, DEFAULT_WORKERS,
+                       DOCS_DOWNLOAD_URL, DOWNLOAD_FILE_NAME_PATTERN,
+                       EXPECTED_STATUS, EXTRACTION_CACHE_NAME, MAIN_DOC_URL,
+                       MERGE_MODE, PEP_API_URL, PEP_MISMATCHES_TITLE,
+                       PEP_NUMBER_PATTERN, PEP_URL, SHARD_FILE_NAME,
+                       SHARD_FILES_PATTERN, VERSION_STATUS_PATTERN,
+                       WHATS_NEW_URL, HTMLTags, ParserBackend, PepSource)
+from extractors import (EXTRACTION_VERSION, WHATS_NEW_INDEX_ATTRS,
+                        WHATS_NEW_INDEX_STRAINER, CachedPage, Page,
+                        extract_cached, extract_pep_status,
+                        extract_whats_new_page, get_strainer, iter_pep_index,
+                        parse_pep_status, read_pep_status)
+from outputs import (FILE_OUTPUTS, control_output, profile_output,
+                     profile_summary_output)
+from profiler import PROFILER
+from state import (Checkpoint, ExtractionCache, content_digest, load_state,
+                   rows_digest, save_state)
+from utils import (download_file, find_all_tags, find_tag, get_attr,
+                   get_cached_response, get_conditional_response, get_response,
+                   get_responses, get_text, get_uncached_response, iter_chunks,
+                   parse_page, process_map, show_progress)
+
+if TYPE_CHECKING:
+    from requests import Response
+    from requests_cache import CachedSession
+
+T = TypeVar('T')
+
+
+def collect_rows(rows: Iterable[T]) -> Optional[List[T]]:
+    """Collect rows yielded by mode, None if nothing has been yielded."""
+    return list(rows) or None
+
+
+def load_pages(
+    session: CachedSession,
+    urls: Iterable[str],
+    cli_args: Any = None,
+    loader: Callable[
+        [CachedSession, str], Optional[Response],
+    ] = get_response,
+) -> Iterator[Optional[Response]]:
+    """Load pages with the workers chosen for the run."""
+    return get_responses(
+        session,
+        urls,
+        getattr(cli_args, 'workers', DEFAULT_WORKERS),
+        loader,
+    )
+
+
+def extract_pages(
+    extractor: Callable[[Optional[Page], str], Any],
+    responses: Iterable[Optional[Response]],
+    cli_args: Any = None,
+) -> Iterator[Any]:
+    """
+    Extract values from responses in the order of responses.
+
+    Raw bodies are sent to the pool of processes if it's chosen
+    for the run, only extracted values are sent back.
+    """
+    if getattr(cli_args, 'extraction_cache', False):
+        return extract_cached_pages(extractor, responses, cli_args)
+    pages = (
+        None if response is None else (response.content, response.encoding)
+        for response in responses
+    )
+    return process_map(
+        partial(
+            extractor,
+            backend=getattr(cli_args, 'backend', ParserBackend.SOUP),
+        ),
+        pages,
+        getattr(cli_args, 'parse_workers', DEFAULT_PARSE_WORKERS),
+    )
+
+
+def extract_cached_pages(
+    extractor: Callable[[Optional[Page], str], Any],
+    responses: Iterable[Optional[Response]],
+    cli_args: Any = None,
+) -> Iterator[Any]:
+    """
+    Extract values parsing only pages changed since they were extracted.
+
+    Values are looked up by URL and hash of body, so unchanged pages
+    cost only a lookup and are never parsed.
+    """
+    cache = ExtractionCache(
+        BASE_DIR / 'state' / EXTRACTION_CACHE_NAME,
+        f'{extractor.__name__}:{EXTRACTION_VERSION}',
+    )
+    keys: Deque[Optional[Tuple[str, str]]] = deque()
+
+    def lookup() -> Iterator[CachedPage]:
+        for response in responses:
+            if response is None:
+                keys.append(None)
+                yield True, None
+                continue
+            key = (response.url, content_digest(response.content))
+            found, value = cache.get(*key)
+            keys.append(None if found else key)
+            yield found, value if found else (
+                response.content, response.encoding,
+            )
+
+    try:
+        for value in process_map(
+            partial(
+                extract_cached,
+                extractor,
+                backend=getattr(cli_args, 'backend', ParserBackend.SOUP),
+            ),
+            lookup(),
+            getattr(cli_args, 'parse_workers', DEFAULT_PARSE_WORKERS),
+        ):
+            key = keys.popleft()
+            if key is not None:
+                cache.put(*key, value)
+            yield value
+    finally:
+        cache.close()
 
 
 def whats_new(
     session: CachedSession,
+    cli_args: Any = None,
 ) -> Optional[
     List[Union[Tuple[str, str, str], Tuple[Sequence[str], str, str]]]
 ]:
@@ -27,112 +158,355 @@ def whats_new(
 
     "What's new" topics and links.
     """
+    return collect_rows(iter_whats_new(session, cli_args))
+
+
+def iter_whats_new(
+    session: CachedSession,
+    cli_args: Any = None,
+) -> Iterator[Union[Tuple[str, str, str], Tuple[Sequence[str], str, str]]]:
+    """
+    Yield "What's new" topics and links as articles are loaded.
+
+    Rows are saved to checkpoint while articles are loaded, --resume
+    yields the saved rows and continues from the last one.
+    """
     response = get_response(session, WHATS_NEW_URL)
     if response is None:
         return
 
-    soup = BeautifulSoup(response.text, features=PARSING_MODULE)
-
-    main_div = find_tag(
-        soup,
-        HTMLTags.SECTION,
-        attrs={'id': 'what-s-new-in-python'},
+    backend = getattr(cli_args, 'backend', ParserBackend.SOUP)
+    soup = parse_page(
+        response.content,
+        backend,
+        get_strainer(WHATS_NEW_INDEX_STRAINER, backend),
+        response.encoding,
     )
+
+    main_div = find_tag(soup, HTMLTags.SECTION, attrs=WHATS_NEW_INDEX_ATTRS)
     div_with_ul = find_tag(
         main_div,
         HTMLTags.DIV,
         attrs={'class': 'toctree-wrapper'},
     )
-    sections_by_python = tqdm(
-        div_with_ul.find_all(HTMLTags.LI, attrs={'class': 'toctree-l1'}),
+    sections_by_python = find_all_tags(
+        div_with_ul, HTMLTags.LI, attrs={'class': 'toctree-l1'},
     )
 
-    results: List[
-        Union[Tuple[str, str, str], Tuple[Sequence[str], str, str]]
-    ] = [('Ссылка на статью', 'Заголовок', 'Редактор, Автор')]
-    for section in tqdm(sections_by_python):
-        version_a_tag = find_tag(section, HTMLTags.A)
-        version_link = urljoin(WHATS_NEW_URL, version_a_tag['href'])
-
-        response = get_response(session, version_link)
-        if response is None:
-            continue
-
-        soup = BeautifulSoup(response.text, PARSING_MODULE)
-        h1 = find_tag(soup, HTMLTags.H1)
-        dl = find_tag(soup, HTMLTags.DL)
-        dl_text = dl.text.replace('\n', ' ')
-
-        results.append((version_link, h1.text, dl_text))
-
-    return results
+    yield 'Ссылка на статью', 'Заголовок', 'Редактор, Автор'
+    version_links = [
+        urljoin(WHATS_NEW_URL, get_attr(find_tag(section, HTMLTags.A), 'href'))
+        for section in sections_by_python
+    ]
+    checkpoint = open_checkpoint(
+        'whats_new', rows_digest(version_links), cli_args,
+    )
+    done = checkpoint.progress.get('done', 0)
+    rows = [tuple(row) for row in checkpoint.progress.get('rows', [])]
+    yield from rows
+    version_links = version_links[done:]
+    responses = load_pages(session, version_links, cli_args)
+    pages = extract_pages(extract_whats_new_page, responses, cli_args)
+    try:
+        for version_link, page in zip(
+            version_links, show_progress(pages, len(version_links)),
+        ):
+            done += 1
+            if page is not None:
+                h1_text, dl_text = page
+                rows.append((version_link, h1_text, dl_text))
+            checkpoint.update({'done': done, 'rows': rows})
+            if page is not None:
+                yield rows[-1]
+    except BaseException:
+        checkpoint.save()
+        raise
+    checkpoint.complete()
 
 
 def latest_versions(
     session: CachedSession,
+    cli_args: Any = None,
 ) -> Optional[List[Tuple[str, str, str]]]:
     """Collect links on docs for different versions of python."""
+    return collect_rows(iter_latest_versions(session, cli_args))
+
+
+def iter_latest_versions(
+    session: CachedSession,
+    cli_args: Any = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """Yield links on docs for different versions of python."""
     response = get_response(session, MAIN_DOC_URL)
     if response is None:
         return
 
-    soup = BeautifulSoup(response.text, features=PARSING_MODULE)
+    soup = parse_page(
+        response.content,
+        getattr(cli_args, 'backend', ParserBackend.SOUP),
+        encoding=response.encoding,
+    )
     sidebar = find_tag(
         soup,
         HTMLTags.DIV,
         attrs={'class': 'sphinxsidebarwrapper'},
     )
-    ul_tags = sidebar.find_all(HTMLTags.UL)
+    ul_tags = find_all_tags(sidebar, HTMLTags.UL)
 
     for ul in ul_tags:
-        if 'All versions' in ul.text:
-            a_tags = ul.find_all(HTMLTags.A)
+        if 'All versions' in get_text(ul):
+            a_tags = find_all_tags(ul, HTMLTags.A)
             break
     else:
         raise Exception('Nothing has been found')
 
-    results = [('Ссылка на документацию', 'Версия', 'Статус')]
+    yield 'Ссылка на документацию', 'Версия', 'Статус'
 
     for a_tag in a_tags:
-        link = a_tag['href']
-        re_search = re.search(VERSION_STATUS_PATTERN, a_tag.text)
+        link = get_attr(a_tag, 'href')
+        a_text = get_text(a_tag)
+        re_search = re.search(VERSION_STATUS_PATTERN, a_text)
         if not re_search:
-            version, status = a_tag.text, ''
+            version, status = a_text, ''
         else:
             version, status = re_search.groups()
-        results.append((link, version, status))
-
-    return results
+        yield link, version, status
 
 
-def download(session: CachedSession) -> None:
+def download(session: CachedSession, cli_args: Any = None) -> None:
     """Download docs for the latest version of python."""
     response = get_response(session, DOCS_DOWNLOAD_URL)
     if response is None:
         return
 
-    soup = BeautifulSoup(response.text, features=PARSING_MODULE)
+    soup = parse_page(
+        response.content,
+        getattr(cli_args, 'backend', ParserBackend.SOUP),
+        encoding=response.encoding,
+    )
     table = find_tag(soup, HTMLTags.TABLE, attrs={'class': 'docutils'})
     pdf_a4_tag = find_tag(
         table,
         HTMLTags.A,
         attrs={'href': re.compile(DOWNLOAD_FILE_NAME_PATTERN)},
     )
-    file_url = urljoin(DOCS_DOWNLOAD_URL, pdf_a4_tag['href'])
+    file_url = urljoin(DOCS_DOWNLOAD_URL, get_attr(pdf_a4_tag, 'href'))
 
     filename = file_url.split('/')[-1]
     downloads_dir = BASE_DIR / 'downloads'
     downloads_dir.mkdir(exist_ok=True)
     filepath = downloads_dir / filename
 
-    response = session.get(file_url)
-    with open(filepath, 'wb') as file:
-        file.write(response.content)
-    logging.info(f'Архив был загружен и сохранён: {filepath}')
+    if download_file(session, file_url, filepath):
+        logging.info(f'Архив был загружен и сохранён: {filepath}')
+
+
+def pep_card_statuses(
+    session: CachedSession,
+    pep_links: Iterable[str],
+    cli_args: Any = None,
+) -> Iterator[Optional[str]]:
+    """Get statuses from PEP cards, None if card hasn't been loaded."""
+    responses = load_pages(session, pep_links, cli_args)
+    yield from show_progress(
+        extract_pages(extract_pep_status, responses, cli_args),
+    )
+
+
+def load_pep_status(
+    session: CachedSession,
+    pep_link: str,
+    backend: str = ParserBackend.SOUP,
+) -> Optional[str]:
+    """
+    Get status of PEP card reading the card only up to the status.
+
+    Card cached with its whole body is taken from the cache, otherwise
+    it's streamed and the rest of it after the status isn't downloaded.
+    """
+    response = get_cached_response(session, pep_link)
+    if response is not None:
+        return extract_pep_status(
+            (response.content, response.encoding), backend,
+        )
+    response = get_uncached_response(session, pep_link, stream=True)
+    if response is None:
+        return None
+    with response:
+        return read_pep_status(
+            iter_chunks(response, CARD_CHUNK_SIZE), response.encoding,
+        )
+
+
+def pep_streamed_statuses(
+    session: CachedSession,
+    pep_links: Iterable[str],
+    cli_args: Any = None,
+) -> Iterator[Optional[str]]:
+    """Get statuses from PEP cards streamed by the loading workers."""
+    statuses = load_pages(
+        session,
+        pep_links,
+        cli_args,
+        loader=partial(
+            load_pep_status,
+            backend=getattr(cli_args, 'backend', ParserBackend.SOUP),
+        ),
+    )
+    yield from show_progress(statuses)
+
+
+def pep_incremental_statuses(
+    session: CachedSession,
+    pep_links: Iterable[str],
+    cli_args: Any = None,
+) -> Iterator[Optional[str]]:
+    """
+    Get statuses reparsing only PEP cards changed since the last run.
+
+    Validators and statuses of cards are kept in the state file,
+    unchanged cards are answered with 304 and reuse the saved status.
+    State of cards which aren't loaded by the run is kept, it's saved
+    even if the caller stops reading statuses early.
+    """
+    state_path = BASE_DIR / 'state' / f'{run_name("pep", cli_args)}.json'
+    saved_state = load_state(state_path)
+    state = dict(saved_state)
+    pep_links, loaded_links = tee(pep_links)
+    responses = load_pages(
+        session,
+        loaded_links,
+        cli_args,
+        loader=lambda session, pep_link: get_conditional_response(
+            session, pep_link, saved_state.get(pep_link),
+        ),
+    )
+    try:
+        for response, pep_link in zip(show_progress(responses), pep_links):
+            if response is None:
+                yield None
+                continue
+            if (
+                response.status_code == HTTPStatus.NOT_MODIFIED
+                and pep_link in saved_state
+            ):
+                state[pep_link] = saved_state[pep_link]
+            else:
+                state[pep_link] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'status': parse_pep_status(
+                        response.content,
+                        getattr(cli_args, 'backend', ParserBackend.SOUP),
+                        response.encoding,
+                    ),
+                }
+            yield state[pep_link]['status']
+    finally:
+        save_state(state_path, state)
+
+
+def get_pep_statuses(
+    session: CachedSession,
+    pep_links: Iterable[str],
+    cli_args: Any = None,
+) -> Iterator[Optional[str]]:
+    """Get PEP statuses from the source chosen for the run."""
+    if getattr(cli_args, 'source', PepSource.CARDS) == PepSource.INDEX:
+        statuses = pep_index_statuses(session)
+        if statuses is not None:
+            return fill_missing_statuses(
+                session, pep_links, statuses, cli_args,
+            )
+        logging.warning(
+            'Индекс PEP недоступен, статусы будут собраны по карточкам',
+        )
+    return get_card_statuses(session, pep_links, cli_args)
+
+
+def get_card_statuses(
+    session: CachedSession,
+    pep_links: Iterable[str],
+    cli_args: Any = None,
+) -> Iterator[Optional[str]]:
+    """Get PEP statuses from the cards loaded the way chosen for the run."""
+    if getattr(cli_args, 'incremental', False):
+        return pep_incremental_statuses(session, pep_links, cli_args)
+    if getattr(cli_args, 'stream_cards', False):
+        return pep_streamed_statuses(session, pep_links, cli_args)
+    return pep_card_statuses(session, pep_links, cli_args)
+
+
+def fill_missing_statuses(
+    session: CachedSession,
+    pep_links: Iterable[str],
+    statuses: Mapping[int, str],
+    cli_args: Any = None,
+) -> Iterator[Optional[str]]:
+    """
+    Match statuses of the structured index with links by PEP number.
+
+    Status of PEP missing in the index is taken from its card, read only
+    up to the status.
+    """
+    for pep_link in pep_links:
+        status = statuses.get(get_pep_number(pep_link))
+        if status is None:
+            logging.warning(
+                f'В индексе PEP нет статуса {pep_link}, '
+                'он будет взят из карточки',
+            )
+            status = load_pep_status(
+                session,
+                pep_link,
+                getattr(cli_args, 'backend', ParserBackend.SOUP),
+            )
+        yield status
+
+
+def pep_index_statuses(
+    session: CachedSession,
+) -> Optional[Dict[int, str]]:
+    """
+    Get statuses from the structured PEP index with one request.
+
+    Statuses are given by PEP number. None is returned if the index
+    can't be loaded or read.
+    """
+    response = get_response(session, PEP_API_URL)
+    if response is None:
+        return
+    try:
+        return {
+            int(pep_info['number']): pep_info['status']
+            for pep_info in response.json().values()
+        }
+    except (AttributeError, KeyError, TypeError, ValueError):
+        logging.exception(f'Не удалось прочитать индекс PEP {PEP_API_URL}')
+
+
+def get_pep_number(pep_link: str) -> Optional[int]:
+    """Get number of PEP from link on its card."""
+    number = re.search(PEP_NUMBER_PATTERN, pep_link)
+    return None if number is None else int(number.group(1))
+
+
+def iter_pep_rows(response: Response) -> Iterator[Tuple[str, str]]:
+    """
+    Yield links and status letters of PEPs from the numerical index.
+
+    Rows are parsed from the body of the index while they are read,
+    none of them is kept.
+    """
+    for pep_link, table_status_letter in iter_pep_index(
+        response.content, response.encoding,
+    ):
+        yield urljoin(PEP_URL, pep_link), table_status_letter
 
 
 def pep(
     session: CachedSession,
+    cli_args: Any = None,
 ) -> List[
     Union[
         Tuple[str],
@@ -146,67 +520,213 @@ def pep(
 
     Print inappropriate statuses.
     """
+    return collect_rows(iter_pep(session, cli_args))
+
+
+def iter_pep(
+    session: CachedSession,
+    cli_args: Any = None,
+) -> Iterator[
+    Union[
+        Tuple[str],
+        Tuple[str, str],
+        Tuple[Tuple[str, ...], str],
+        Tuple[str, Tuple[str, ...]],
+    ]
+]:
+    """
+    Yield quantity of PEPs by status, then inappropriate statuses.
+
+    With --shard i/N only every N-th row of the index starting from i-th
+    is checked, partial result is also saved for merge mode. Counts are
+    saved to checkpoint while cards are loaded, --resume continues
+    from the last one.
+    """
     response = get_response(session, PEP_URL)
     if response is None:
         return
+    index_digest = content_digest(response.content)
+    pep_rows: Iterator[Tuple[int, Tuple[str, str]]] = enumerate(
+        iter_pep_rows(response),
+    )
+    shard = getattr(cli_args, 'shard', None)
+    if shard is not None:
+        index, count = shard
+        pep_rows = (
+            pep_row for pep_row in pep_rows
+            if pep_row[0] % count == index - 1
+        )
+    checkpoint = open_checkpoint(
+        run_name('pep', cli_args), index_digest, cli_args,
+    )
+    done = checkpoint.progress.get('done', 0)
+    pep_rows, link_rows = tee(islice(pep_rows, done, None))
+    statuses = get_pep_statuses(
+        session, (pep_link for _, (pep_link, _) in link_rows), cli_args,
+    )
 
-    soup = BeautifulSoup(response.text, features=PARSING_MODULE)
+    quantity: Counter[str] = Counter(checkpoint.progress.get('quantity', {}))
+    mismatches: List[Tuple[int, str, str, str]] = [
+        tuple(mismatch)
+        for mismatch in checkpoint.progress.get('mismatches', [])
+    ]
+    try:
+        for status, (position, pep_row) in zip(statuses, pep_rows):
+            done += 1
+            check_pep_status(
+                pep_row, position, status, quantity, mismatches,
+            )
+            checkpoint.update({
+                'done': done, 'quantity': quantity, 'mismatches': mismatches,
+            })
+    except BaseException:
+        checkpoint.save()
+        raise
+
+    if shard is not None:
+        save_state(
+            BASE_DIR / 'results' / SHARD_FILE_NAME.format(
+                index=index, count=count,
+            ),
+            {
+                'index': index,
+                'count': count,
+                'digest': index_digest,
+                'quantity': quantity,
+                'mismatches': mismatches,
+            },
+        )
+    checkpoint.complete()
+    yield from pep_table(quantity, mismatches)
+
+
+def check_pep_status(
+    pep_row: Tuple[str, str],
+    position: int,
+    status: Optional[str],
+    quantity: Counter[str],
+    mismatches: List[Tuple[int, str, str, str]],
+) -> None:
+    """Count PEP with expected status by letter or add it to mismatches."""
+    if status is None:
+        return
 
-    main_div = find_tag(
-        soup,
-        HTMLTags.SECTION,
-        attrs={'id': 'numerical-index'},
+    pep_link, table_status_letter = pep_row
+    if status in EXPECTED_STATUS[table_status_letter]:
+        quantity[table_status_letter] += 1
+        return
+    mismatches.append((position, pep_link, status, table_status_letter))
+
+
+def run_name(mode: str, cli_args: Any = None) -> str:
+    """
+    Name state files of the run after its mode and shard.
+
+    Shards of one index run in parallel, each of them keeps
+    its own files.
+    """
+    shard = getattr(cli_args, 'shard', None)
+    if shard is None:
+        return mode
+    index, count = shard
+    return f'{mode}_{index}_of_{count}'
+
+
+def open_checkpoint(
+    name: str,
+    key: str,
+    cli_args: Any = None,
+) -> Checkpoint:
+    """
+    Open checkpoint of crawl of pages with the key of their list.
+
+    Progress is saved only with --checkpoint-interval, it's loaded
+    with --resume if it was saved for the same pages.
+    """
+    return Checkpoint(
+        BASE_DIR / 'state' / f'checkpoint_{name}.json',
+        key,
+        getattr(cli_args, 'checkpoint_interval', None),
+        getattr(cli_args, 'resume', False),
     )
-    tbody = find_tag(main_div, HTMLTags.TBODY)
-    pep_list = tqdm(tbody.find_all(HTMLTags.TR))
 
+
+def pep_table(
+    quantity: Mapping[str, int],
+    mismatches: Iterable[Sequence[Any]],
+) -> Iterator[
+    Union[
+        Tuple[str],
+        Tuple[str, str],
+        Tuple[Tuple[str, ...], str],
+        Tuple[str, Tuple[str, ...]],
+    ]
+]:
+    """
+    Yield table of pep mode.
+
+    Quantity is counted by status letters of the index, mismatches are
+    position in the index, link, card status and status letter.
+    """
     pep_quantity = dict.fromkeys(EXPECTED_STATUS.values(), 0)
-    result: List[
-        Union[
-            Tuple[str],
-            Tuple[str, str],
-            Tuple[Tuple[str, ...], str],
-            Tuple[str, Tuple[str, ...]],
-        ]
-    ] = [('Статус', 'Количество')]
-    mismatched_statuses: List[
-        Union[Tuple[str], Tuple[str, str], Tuple[str, Tuple[str, ...]]]
-    ] = [('Несовпадающие статусы:',)]
-
-    for pep_entity in pep_list:
-        pep_link = urljoin(PEP_URL, pep_entity.a['href'])
-        response = get_response(session, pep_link)
-        if response is None:
-            continue
-
-        soup = BeautifulSoup(response.text, PARSING_MODULE)
-        dl_tag = find_tag(
-            soup,
-            HTMLTags.DL,
-            attrs={'class': 'rfc2822 field-list simple'},
-        )
-        status_tag = find_tag(
-            dl_tag,
-            HTMLTags.ABBR,
+    for table_status_letter, letter_quantity in quantity.items():
+        pep_quantity[EXPECTED_STATUS[table_status_letter]] += letter_quantity
+
+    yield 'Статус', 'Количество'
+    for status, status_quantity in pep_quantity.items():
+        yield status, str(status_quantity)
+    yield 'Total', str(sum(pep_quantity.values()))
+    yield (PEP_MISMATCHES_TITLE,)
+    for _, pep_link, status, table_status_letter in sorted(mismatches):
+        yield (pep_link,)
+        yield 'Статус в карточке:', status
+        yield 'Ожидаемые статусы:', EXPECTED_STATUS[table_status_letter]
+
+
+def iter_merge(
+    session: CachedSession,
+    cli_args: Any = None,
+) -> Iterator[
+    Union[
+        Tuple[str],
+        Tuple[str, str],
+        Tuple[Tuple[str, ...], str],
+        Tuple[str, Tuple[str, ...]],
+    ]
+]:
+    """
+    Yield table of pep mode merged from partial results of shards.
+
+    Partial results are read from the results directory, they must
+    come from all shards of the same split of the same index, which is
+    checked by hash of the index page saved by every shard.
+    """
+    shards = [
+        load_state(path)
+        for path in (BASE_DIR / 'results').glob(SHARD_FILES_PATTERN)
+    ]
+    splits = {(shard.get('count'), shard.get('digest')) for shard in shards}
+    if len(splits) != 1:
+        logging.error(
+            'Для объединения нужны частичные результаты одного '
+            f'разбиения индекса PEP, найдено разбиений: {len(splits)}',
         )
-        status = status_tag.text
-        table_status_letter = find_tag(pep_entity, HTMLTags.ABBR).text[1:]
-
-        if status in EXPECTED_STATUS[table_status_letter]:
-            pep_quantity[EXPECTED_STATUS[table_status_letter]] += 1
-            continue
-        mismatched_statuses.append((pep_link,))
-        mismatched_statuses.append(('Статус в карточке:', status))
-        mismatched_statuses.append(
-            ('Ожидаемые статусы:', EXPECTED_STATUS[table_status_letter]),
+        return
+    (count, _), = splits
+    if sorted(shard.get('index') for shard in shards) != [
+        *range(1, count + 1),
+    ]:
+        logging.error(
+            f'Для объединения нужны частичные результаты всех {count} шардов',
         )
+        return
 
-    result += [
-        (status, str(quantity)) for status, quantity in pep_quantity.items()
-    ]
-    result += [('Total', str(sum(pep_quantity.values())))]
-    result += mismatched_statuses
-    return result
+    quantity: Counter[str] = Counter()
+    mismatches: List[Sequence[Any]] = []
+    for shard in shards:
+        quantity.update(shard['quantity'])
+        mismatches += shard['mismatches']
+    yield from pep_table(quantity, mismatches)
 
 
 MODE_TO_FUNCTION = {
@@ -215,26 +735,98 @@ MODE_TO_FUNCTION = {
     'download': download,
     'pep': pep,
 }
+MODE_TO_ITERATOR = {
+    'whats-new': iter_whats_new,
+    'latest-versions': iter_latest_versions,
+    'pep': iter_pep,
+    MERGE_MODE: iter_merge,
+}  # modes yielding rows while pages are loaded
+
+
+def run_mode(
+    session: CachedSession,
+    cli_args: Any,
+    console_lock: Optional[Lock] = None,
+) -> None:
+    """
+    Run mode and pass its rows to the output chosen for the run.
+
+    Rows of modes running at once are printed to console
+    under the lock, so the outputs of modes aren't mixed.
+    """
+    if cli_args.mode not in MODE_TO_ITERATOR:
+        MODE_TO_FUNCTION[cli_args.mode](session, cli_args)
+        return
+    rows = MODE_TO_ITERATOR[cli_args.mode](session, cli_args)
+    if console_lock is None or cli_args.output in FILE_OUTPUTS:
+        control_output(rows, cli_args)
+        return
+    rows = list(rows)
+    with console_lock:
+        control_output(rows, cli_args)
+
+
+def run_modes(session: CachedSession, cli_args: Any) -> None:
+    """
+    Run every mode of the run with the same session.
+
+    Modes share responses cache and connections, with --parallel-modes
+    they run at once, each mode writes its own output.
+    """
+    modes = cli_args.mode
+    if ALL_MODES in modes:
+        modes = list(MODE_TO_FUNCTION)
+    runs = [
+        Namespace(**{**vars(cli_args), 'mode': mode})
+        for mode in dict.fromkeys(modes)
+    ]
+    if not getattr(cli_args, 'parallel_modes', False) or len(runs) < 2:
+        for run in runs:
+            run_mode(session, run)
+        return
+    console_lock = Lock()
+    with ThreadPoolExecutor(max_workers=len(runs)) as executor:
+        futures = [
+            executor.submit(run_mode, session, run, console_lock)
+            for run in runs
+        ]
+        for future in futures:
+            future.result()
 
 
 def main() -> None:
     """Start the parser depending on the mode. Maintain logging."""
-    configure_logging()
-    logging.info('Парсер запущен!')
-
-    arg_parser = configure_argument_parser(MODE_TO_FUNCTION.keys())
+    arg_parser = configure_argument_parser(
+        (*MODE_TO_FUNCTION, MERGE_MODE, ALL_MODES),
+    )
     args = arg_parser.parse_args()
+    configure_logging(args.log_stack_level)
+    logging.info('Парсер запущен!')
     logging.info(f'Аргументы командной строки: {args}')
 
-    session = requests_cache.CachedSession()
+    from cache import create_session, evict_cache
+    from throttling import count_skipped
+
+    session = create_session(args)
     if args.clear_cache:
         session.cache.clear()
-
-    parser_mode = args.mode
-    results = MODE_TO_FUNCTION[parser_mode](session)
-
-    if results is not None:
-        control_output(results, args)
+        (BASE_DIR / 'state' / EXTRACTION_CACHE_NAME).unlink(missing_ok=True)
+    PROFILER.enabled = args.profile or args.profile_json
+
+    run_modes(session, args)
+    evict_cache(session)
+    skipped = count_skipped(session)
+    if skipped:
+        logging.warning(
+            f'Не загружено страниц из-за недоступности сайтов: {skipped}',
+        )
+    if args.profile:
+        profile_summary_output(PROFILER.summary())
+    if args.profile_json:
+        profile_output(
+            PROFILER.to_dict(),
+            Namespace(mode='+'.join(dict.fromkeys(args.mode))),
+        )
     logging.info('Парсер завершил работу.')
 
 
@@ -1,73 +1,84 @@
 """Contain output settings for different modes."""
 import csv
 import datetime as dt
+import gzip
+import json
 import logging
-from typing import Any, List, Sequence, Tuple, Union
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
 
-from prettytable import PrettyTable
+from constants import (BASE_DIR, DATETIME_FORMAT, MERGE_MODE,
+                       PEP_MISMATCHES_TITLE, RESPONSES_ENCODING, OutputMode)
 
-from constants import BASE_DIR, DATETIME_FORMAT, RESPONSES_ENCODING, OutputMode
+Row = Union[
+    Tuple[str],
+    Tuple[str, str],
+    Tuple[str, str, str],
+    Tuple[Tuple[str, ...], str],
+    Tuple[str, Tuple[str, ...]],
+    Tuple[Sequence[str], str, str],
+]
+
+SQLITE_BATCH_SIZE = 1000
+RECORD_TABLES = {
+    'whats_new': (('link', 'TEXT'), ('title', 'TEXT'), ('editors', 'TEXT')),
+    'latest_versions': (
+        ('link', 'TEXT'), ('version', 'TEXT'), ('status', 'TEXT'),
+    ),
+    'pep_statuses': (('status', 'TEXT'), ('quantity', 'INTEGER')),
+    'pep_mismatches': (
+        ('link', 'TEXT'),
+        ('card_status', 'TEXT'),
+        ('expected_statuses', 'TEXT'),
+    ),
+}  # columns of records in JSON Lines and SQLite outputs
 
 
 def control_output(
-    results: Union[
-        List[
-            Union[
-                Tuple[str],
-                Tuple[str, str],
-                Tuple[Tuple[str, ...], str],
-                Tuple[str, Tuple[str, ...]],
-            ]
-        ],
-        List[Tuple[str, str, str]],
-        List[Union[Tuple[str, str, str], Tuple[Sequence[str], str, str]]],
-    ],
+    results: Iterable[Row],
     cli_args: Any,
 ) -> None:
-    """Change output depeends on chosen method."""
+    """
+    Change output depeends on chosen method.
+
+    Rows may be yielded while pages are loaded, console and file
+    outputs write every row as soon as it comes.
+    """
+    rows = iter(results)
+    first_row = next(rows, None)
+    if first_row is None:
+        logging.warning('Нет данных для вывода')
+        return
+    results = chain((first_row,), rows)
     output = cli_args.output
     if output == OutputMode.PRETTY:
         pretty_output(results)
-    elif output == OutputMode.FILE:
-        file_output(results, cli_args)
+    elif output in FILE_OUTPUTS:
+        FILE_OUTPUTS[output](results, cli_args)
     else:
         default_output(results)
 
 
 def default_output(
-    results: Union[
-        List[
-            Union[
-                Tuple[str],
-                Tuple[str, str],
-                Tuple[Tuple[str, ...], str],
-                Tuple[str, Tuple[str, ...]],
-            ]
-        ],
-        List[Tuple[str, str, str]],
-        List[Union[Tuple[str, str, str], Tuple[Sequence[str], str, str]]],
-    ],
+    results: Iterable[Row],
 ) -> None:
     """Describe default output."""
     for row in results:
-        print(*row)
+        print(*row, flush=True)
 
 
 def pretty_output(
-    results: Union[
-        List[
-            Union[
-                Tuple[str],
-                Tuple[str, str],
-                Tuple[Tuple[str, ...], str],
-                Tuple[str, Tuple[str, ...]],
-            ]
-        ],
-        List[Tuple[str, str, str]],
-        List[Union[Tuple[str, str, str], Tuple[Sequence[str], str, str]]],
-    ],
+    results: Iterable[Row],
 ) -> None:
-    """Describe output using pretty table."""
+    """Describe output using pretty table, it needs all rows at once."""
+    from prettytable import PrettyTable
+
+    results = list(results)
     table = PrettyTable()
     table.field_names = results[0]
     table.align = 'l'
@@ -76,29 +87,162 @@ def pretty_output(
 
 
 def file_output(
-    results: Union[
-        List[
-            Union[
-                Tuple[str],
-                Tuple[str, str],
-                Tuple[Tuple[str, ...], str],
-                Tuple[str, Tuple[str, ...]],
-            ]
-        ],
-        List[Tuple[str, str, str]],
-        List[Union[Tuple[str, str, str], Tuple[Sequence[str], str, str]]],
-    ],
+    results: Iterable[Row],
     cli_args: Any,
 ) -> None:
-    """Describe ouutput in file."""
+    """
+    Describe ouutput in file.
+
+    Rows are flushed to the partial file as they come,
+    it's renamed to the results file when all rows are written.
+    """
+    with atomic_output(cli_args, '.csv') as file_path:
+        with open(file_path, 'w', encoding=RESPONSES_ENCODING) as f:
+            writer = csv.writer(f, dialect='unix')
+            for row in results:
+                writer.writerow(row)
+                f.flush()
+
+
+def gzip_output(results: Iterable[Row], cli_args: Any) -> None:
+    """Describe output in gzip-compressed CSV file."""
+    with atomic_output(cli_args, '.csv.gz') as file_path:
+        with gzip.open(
+            file_path, 'wt', encoding=RESPONSES_ENCODING, newline='',
+        ) as f:
+            csv.writer(f, dialect='unix').writerows(results)
+
+
+def jsonl_output(results: Iterable[Row], cli_args: Any) -> None:
+    """Describe output in JSON Lines file, a record of a table per line."""
+    with atomic_output(cli_args, '.jsonl') as file_path:
+        with open(file_path, 'w', encoding=RESPONSES_ENCODING) as f:
+            for table, record in iter_records(cli_args.mode, results):
+                f.write(json.dumps(
+                    {'table': table, **record}, ensure_ascii=False,
+                ))
+                f.write('\n')
+
+
+def sqlite_output(results: Iterable[Row], cli_args: Any) -> None:
+    """Describe output in SQLite database with a table per kind of rows."""
+    with atomic_output(cli_args, '.sqlite') as file_path:
+        connection = sqlite3.connect(file_path)
+        try:
+            batches: Dict[str, List[Tuple[Any, ...]]] = {}
+            for table, record in iter_records(cli_args.mode, results):
+                if table not in batches:
+                    create_table(connection, table)
+                    batches[table] = []
+                batches[table].append(tuple(record.values()))
+                if len(batches[table]) >= SQLITE_BATCH_SIZE:
+                    insert_rows(connection, table, batches[table])
+                    batches[table] = []
+            for table, rows in batches.items():
+                insert_rows(connection, table, rows)
+        finally:
+            connection.close()
+
+
+def create_table(connection: sqlite3.Connection, table: str) -> None:
+    """Create table of records with its columns."""
+    columns = ', '.join(
+        f'{column} {column_type}'
+        for column, column_type in RECORD_TABLES[table]
+    )
+    connection.execute(f'CREATE TABLE {table} ({columns})')
+
+
+def insert_rows(
+    connection: sqlite3.Connection,
+    table: str,
+    rows: List[Tuple[Any, ...]],
+) -> None:
+    """Insert batch of rows with a single transaction."""
+    placeholders = ', '.join('?' * len(RECORD_TABLES[table]))
+    with connection:
+        connection.executemany(
+            f'INSERT INTO {table} VALUES ({placeholders})', rows,
+        )
+
+
+def iter_records(
+    mode: str, results: Iterable[Row],
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Convert rows of mode to records with named columns.
+
+    Table header of rows is skipped. Rows of PEP mode are split into
+    quantities of statuses and mismatched statuses of PEP cards.
+    """
+    rows = iter(results)
+    next(rows, None)
+    if mode not in ('pep', MERGE_MODE):
+        table = mode.replace('-', '_')
+        columns = [column for column, _ in RECORD_TABLES[table]]
+        for row in rows:
+            yield table, dict(zip(columns, row))
+        return
+    for status, *quantity in rows:
+        if status == PEP_MISMATCHES_TITLE:
+            break
+        if status != 'Total':
+            yield 'pep_statuses', {
+                'status': join_values(status),
+                'quantity': int(quantity[0]),
+            }
+    for (link,), (_, card_status), (_, expected) in zip(rows, rows, rows):
+        yield 'pep_mismatches', {
+            'link': link,
+            'card_status': card_status,
+            'expected_statuses': join_values(expected),
+        }
+
+
+def join_values(value: Union[str, Sequence[str]]) -> str:
+    """Join several values of a cell."""
+    if isinstance(value, str):
+        return value
+    return ', '.join(value)
+
+
+@contextmanager
+def atomic_output(cli_args: Any, suffix: str) -> Iterator[Path]:
+    """
+    Give partial path of results file, rename it when it's written.
+
+    Readers never see a partially written results file,
+    the partial file is removed if writing fails.
+    """
     results_dir = BASE_DIR / 'results'
     results_dir.mkdir(exist_ok=True)
-    parser_mode = cli_args.mode
-    now = dt.datetime.now()
-    now_formatted = now.strftime(DATETIME_FORMAT)
-    file_name = f'{parser_mode}_{now_formatted}.csv'
-    file_path = results_dir / file_name
-    with open(file_path, 'w', encoding=RESPONSES_ENCODING) as f:
-        writer = csv.writer(f, dialect='unix')
-        writer.writerows(results)
+    now_formatted = dt.datetime.now().strftime(DATETIME_FORMAT)
+    file_path = results_dir / f'{cli_args.mode}_{now_formatted}{suffix}'
+    part_path = file_path.with_name(file_path.name + '.part')
+    try:
+        yield part_path
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+    os.replace(part_path, file_path)
     logging.info(f'Файл с результатами был сохранён: {file_path}')
+
+
+def profile_output(profile: Dict[str, Any], cli_args: Any) -> None:
+    """Describe output of run profile in JSON file next to results."""
+    with atomic_output(cli_args, '_profile.json') as file_path:
+        with open(file_path, 'w', encoding=RESPONSES_ENCODING) as f:
+            json.dump(profile, f, ensure_ascii=False, indent=2)
+
+
+def profile_summary_output(lines: Iterable[str]) -> None:
+    """Print summary of run profile to stderr apart from the results."""
+    print(*lines, sep='\n', file=sys.stderr)
+
+
+FILE_OUTPUTS = {
+    OutputMode.FILE: file_output,
+    OutputMode.GZIP: gzip_output,
+    OutputMode.JSONL: jsonl_output,
+    OutputMode.SQLITE: sqlite_output,
+}
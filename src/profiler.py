@@ -0,0 +1,161 @@
+"""Contain per-stage timing and counters of the parser run.
+
+Profiler is disabled by default and records nothing until
+it is enabled with --profile option.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+SLOWEST_URLS = 10
+
+
+class StageStats:
+    """Latency histogram of one stage."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, seconds: float) -> None:
+        """Add one measurement."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect_left(HISTOGRAM_BOUNDS_MS, seconds * 1000)] += 1
+
+    def merge(self, other: 'StageStats') -> None:
+        """Add measurements of the same stage made elsewhere."""
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.buckets = [
+            mine + theirs for mine, theirs in zip(self.buckets, other.buckets)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe stats as JSON-serializable dict."""
+        labels = [f'<={bound}ms' for bound in HISTOGRAM_BOUNDS_MS]
+        labels.append(f'>{HISTOGRAM_BOUNDS_MS[-1]}ms')
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 6),
+            'mean_ms': round(self.total / self.count * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'histogram': dict(zip(labels, self.buckets)),
+        }
+
+
+class Profiler:
+    """Collect stage latencies, cache hits and bytes of responses."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything recorded."""
+        self.stages: Dict[str, StageStats] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.bytes_received = 0
+        self.url_seconds: Dict[str, float] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Record duration of the stage."""
+        with self.lock:
+            self.stages.setdefault(stage, StageStats()).add(seconds)
+
+    def record_response(
+        self, url: str, seconds: float, from_cache: bool, size: int = 0,
+    ) -> None:
+        """Record loading of page, cached responses aren't transferred."""
+        self.record('cache' if from_cache else 'network', seconds)
+        with self.lock:
+            self.url_seconds[url] = self.url_seconds.get(url, 0) + seconds
+            if from_cache:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+                self.bytes_received += size
+
+    def record_bytes(self, size: int) -> None:
+        """Record bytes of streamed response."""
+        with self.lock:
+            self.bytes_received += size
+
+    def take_stages(self) -> Dict[str, StageStats]:
+        """Get stages recorded since the last call and forget them."""
+        with self.lock:
+            stages, self.stages = self.stages, {}
+        return stages
+
+    def merge_stages(self, stages: Dict[str, StageStats]) -> None:
+        """Add stages recorded by another process."""
+        with self.lock:
+            for stage, stats in stages.items():
+                self.stages.setdefault(stage, StageStats()).merge(stats)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Measure duration of the block if profiler is enabled."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the run as JSON-serializable dict."""
+        with self.lock:
+            return {
+                'stages': {
+                    stage: stats.to_dict()
+                    for stage, stats in self.stages.items()
+                },
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'bytes_received': self.bytes_received,
+                'urls': {
+                    url: round(seconds, 6)
+                    for url, seconds in self.url_seconds.items()
+                },
+            }
+
+    def summary(self) -> List[str]:
+        """Describe the run as lines for console."""
+        profile = self.to_dict()
+        lines = [
+            f'{"Этап":<10}{"Вызовов":>9}{"Всего, с":>10}'
+            f'{"Среднее, мс":>13}{"Макс., мс":>11}',
+        ]
+        for stage, stats in profile['stages'].items():
+            lines.append(
+                f'{stage:<10}{stats["count"]:>9}'
+                f'{stats["total_seconds"]:>10.3f}'
+                f'{stats["mean_ms"]:>13.3f}{stats["max_ms"]:>11.3f}',
+            )
+        lines.append(
+            f'Кеш: попаданий {profile["cache_hits"]}, '
+            f'промахов {profile["cache_misses"]}; '
+            f'получено байт: {profile["bytes_received"]}',
+        )
+        slowest = sorted(
+            profile['urls'].items(), key=lambda item: item[1], reverse=True,
+        )[:SLOWEST_URLS]
+        if slowest:
+            lines.append('Самые медленные страницы:')
+            lines += [f'{seconds:.3f} {url}' for url, seconds in slowest]
+        return lines
+
+
+PROFILER = Profiler()
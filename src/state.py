@@ -0,0 +1,164 @@
+"""Contain persistent state stored between parser runs."""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from constants import RESPONSES_ENCODING
+
+EXTRACTION_BATCH_SIZE = 500
+
+
+def load_state(path: Path) -> Dict[str, Any]:
+    """Load saved state, empty state if it hasn't been saved yet."""
+    try:
+        with open(path, encoding=RESPONSES_ENCODING) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        logging.warning(f'Файл состояния повреждён и не будет учтён: {path}')
+        return {}
+
+
+def save_state(path: Path, state: Dict[str, Any]) -> None:
+    """
+    Save state atomically, so the file is never left partially written.
+
+    Every save is written to its own temporary file, processes saving
+    the same state at once don't write to one file.
+    """
+    path.parent.mkdir(exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(
+        prefix=path.name + '.', suffix='.tmp', dir=path.parent,
+    )
+    try:
+        with open(descriptor, 'w', encoding=RESPONSES_ENCODING) as file:
+            json.dump(state, file, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def content_digest(content: bytes) -> str:
+    """Get hash of response body."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def rows_digest(rows: Iterable[Any]) -> str:
+    """Get hash of rows, they are hashed one by one."""
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(json.dumps(row, ensure_ascii=False).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Values extracted from pages by one extractor.
+
+    A value is found only if the page body has the same hash as when
+    the value was extracted. Only the last value of every URL is kept,
+    new values are written in batches.
+    """
+
+    def __init__(self, path: Path, extractor: str) -> None:
+        path.parent.mkdir(exist_ok=True)
+        self.extractor = extractor
+        self.pending: List[Tuple[str, str, str, bytes]] = []
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS extracted ('
+            'extractor TEXT, url TEXT, digest TEXT, value BLOB, '
+            'PRIMARY KEY (extractor, url))',
+        )
+
+    def get(self, url: str, digest: str) -> Tuple[bool, Any]:
+        """Get flag whether the value is found and the value itself."""
+        row = self.connection.execute(
+            'SELECT value FROM extracted '
+            'WHERE extractor = ? AND url = ? AND digest = ?',
+            (self.extractor, url, digest),
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def put(self, url: str, digest: str, value: Any) -> None:
+        """Save value extracted from the page with the hash."""
+        self.pending.append(
+            (self.extractor, url, digest, pickle.dumps(value)),
+        )
+        if len(self.pending) >= EXTRACTION_BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write pending values with a single transaction."""
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO extracted VALUES (?, ?, ?, ?)',
+                self.pending,
+            )
+        self.pending = []
+
+    def close(self) -> None:
+        """Write pending values and close the database."""
+        self.flush()
+        self.connection.close()
+
+
+class Checkpoint:
+    """
+    Progress of a crawl saved every few pages.
+
+    Progress is saved with the key of the pages crawled, so a resumed
+    crawl gets it only for the same pages. The file is removed when
+    the crawl is finished.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        key: str,
+        interval: Optional[int] = None,
+        resume: bool = False,
+    ) -> None:
+        self.path = path
+        self.key = key
+        self.interval = interval
+        self.pending = 0
+        self.progress: Dict[str, Any] = {}
+        saved = load_state(path) if resume else {}
+        if saved.get('key') == key:
+            self.progress = saved['progress']
+            logging.info(f'Обход продолжен с контрольной точки: {path}')
+        elif saved:
+            logging.warning(
+                'Контрольная точка сделана для других страниц '
+                f'и не будет учтена: {path}',
+            )
+
+    def update(self, progress: Dict[str, Any]) -> None:
+        """Keep progress, save it after every interval of pages."""
+        self.progress = progress
+        self.pending += 1
+        if self.interval is not None and self.pending >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        """Save progress, nothing is saved without interval."""
+        if self.interval is None:
+            return
+        save_state(self.path, {'key': self.key, 'progress': self.progress})
+        self.pending = 0
+
+    def complete(self) -> None:
+        """Remove checkpoint of finished crawl."""
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,285 @@
+"""Contain throttling of requests to every host.
+
+Requests to a host are limited by a token bucket and by the number
+of requests in flight. Both limits are halved when the host answers
+429 or 503 and grow back step by step while it answers successfully.
+After repeated failures requests to the host fail fast until a trial
+request succeeds. Cached responses never reach the adapter,
+so they aren't throttled.
+"""
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from requests import PreparedRequest, RequestException, Response, Session
+from requests.adapters import HTTPAdapter
+
+from constants import (BREAKER_RESET_TIMEOUT, DEFAULT_BREAKER_THRESHOLD,
+                       DEFAULT_CONNECT_TIMEOUT, DEFAULT_RATE_LIMIT,
+                       DEFAULT_READ_TIMEOUT, DEFAULT_RETRIES, DEFAULT_WORKERS,
+                       THROTTLE_STATUSES)
+from exceptions import CircuitOpenError
+from profiler import PROFILER
+
+MIN_RATE = 0.5  # requests per second
+RATE_STEP = 0.5  # rate increase after every successful request
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_MAX = 30.0  # seconds
+
+
+class HostLimiter:
+    """Token bucket and adaptive limit of requests in flight to a host."""
+
+    def __init__(self, rate: float, concurrency: int) -> None:
+        self.max_rate = self.rate = rate
+        self.max_concurrency = self.concurrency = float(concurrency)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+
+    def refill(self, now: float) -> None:
+        """Add tokens for the time passed, a second of them at most."""
+        self.tokens = min(
+            max(self.rate, 1.0),
+            self.tokens + (now - self.updated) * self.rate,
+        )
+        self.updated = now
+
+    def acquire(self) -> None:
+        """Wait until a request to the host is allowed."""
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self.refill(now)
+                timeout: Optional[float] = self.paused_until - now
+                if timeout <= 0:
+                    timeout = None
+                    if self.tokens < 1:
+                        timeout = (1 - self.tokens) / self.rate
+                    elif self.in_flight < int(self.concurrency):
+                        self.tokens -= 1
+                        self.in_flight += 1
+                        return
+                self.condition.wait(timeout)
+
+    def release(
+        self, throttled: Optional[bool] = None, retry_after: float = 0.0,
+    ) -> None:
+        """
+        Finish the request and adapt limits to its outcome.
+
+        Limits aren't changed if the request has failed without answer.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.rate = max(MIN_RATE, self.rate / 2)
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.paused_until = max(
+                    self.paused_until, time.monotonic() + retry_after,
+                )
+            elif throttled is not None:
+                self.rate = min(self.max_rate, self.rate + RATE_STEP)
+                self.concurrency = min(
+                    self.max_concurrency,
+                    self.concurrency + 1 / self.concurrency,
+                )
+            self.condition.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Stop requests to a host after repeated failures.
+
+    When the circuit is open, a single trial request is let through
+    after reset timeout, its success closes the circuit.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+    ) -> None:
+        self.host = host
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Check whether a request can be sent, count skipped ones."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if (
+                not self.trial
+                and time.monotonic() - self.opened_at >= self.reset_timeout
+            ):
+                self.trial = True
+                return True
+            self.skipped += 1
+            return False
+
+    def record(self, success: bool) -> None:
+        """Record outcome of the request, open circuit after failures."""
+        with self.lock:
+            self.trial = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is None and self.failures < self.threshold:
+                return
+            if self.opened_at is None:
+                logging.error(
+                    f'Сайт {self.host} не отвечает, запросы к нему '
+                    f'приостановлены на {self.reset_timeout:.0f} с',
+                )
+            self.opened_at = time.monotonic()
+
+
+def get_retry_after(headers: Mapping[str, str]) -> float:
+    """Get seconds to wait from Retry-After header, 0 if it's absent."""
+    value = headers.get('Retry-After', '').strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, retry_after: float = 0.0) -> float:
+    """Get delay before retry with full jitter or after Retry-After."""
+    if retry_after:
+        return retry_after + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """Send requests within limits of hosts, retry throttled ones."""
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE_LIMIT,
+        concurrency: int = DEFAULT_WORKERS,
+        retries: int = DEFAULT_RETRIES,
+        timeout: Tuple[float, float] = (
+            DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT,
+        ),
+        breaker_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.rate = rate
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.breaker_threshold = breaker_threshold
+        self.limiters: Dict[str, HostLimiter] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.hosts_lock = threading.Lock()
+
+    def get_limiter(self, url: str) -> HostLimiter:
+        """Get limiter of the host of url."""
+        host = urlsplit(url).netloc
+        with self.hosts_lock:
+            if host not in self.limiters:
+                self.limiters[host] = HostLimiter(self.rate, self.concurrency)
+            return self.limiters[host]
+
+    def get_breaker(self, url: str) -> CircuitBreaker:
+        """Get circuit breaker of the host of url."""
+        host = urlsplit(url).netloc
+        with self.hosts_lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(
+                    host, self.breaker_threshold,
+                )
+            return self.breakers[host]
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:
+        """
+        Send request with timeouts unless the host is failing.
+
+        Server errors and requests failed without answer are counted
+        by the circuit breaker of the host.
+        """
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        breaker = self.get_breaker(request.url)
+        if not breaker.allow():
+            raise CircuitOpenError(
+                f'Запросы к сайту приостановлены: {request.url}',
+                request=request,
+            )
+        try:
+            response = self.send_throttled(request, **kwargs)
+        except RequestException:
+            breaker.record(False)
+            raise
+        breaker.record(
+            response.status_code < HTTPStatus.INTERNAL_SERVER_ERROR,
+        )
+        return response
+
+    def send_throttled(
+        self, request: PreparedRequest, **kwargs: Any,
+    ) -> Response:
+        """Send request, throttled answers are retried with backoff."""
+        limiter = self.get_limiter(request.url)
+        attempt = 0
+        while True:
+            with PROFILER.measure('throttle'):
+                limiter.acquire()
+            try:
+                response = super().send(request, **kwargs)
+            except Exception:
+                limiter.release()
+                raise
+            throttled = response.status_code in THROTTLE_STATUSES
+            retry_after = (
+                get_retry_after(response.headers) if throttled else 0.0
+            )
+            limiter.release(throttled, retry_after)
+            if (
+                not throttled
+                or attempt >= self.retries
+                or retry_after > BACKOFF_MAX
+            ):
+                return response
+            response.close()
+            delay = backoff_delay(attempt, retry_after)
+            logging.warning(
+                f'Сервер ограничил запросы ({response.status_code}), '
+                f'повтор через {delay:.1f} с: {request.url}',
+            )
+            with PROFILER.measure('backoff'):
+                time.sleep(delay)
+            attempt += 1
+
+
+def count_skipped(session: Session) -> int:
+    """Count requests skipped by circuit breakers of the session."""
+    adapters = {
+        id(adapter): adapter for adapter in session.adapters.values()
+        if isinstance(adapter, ThrottledAdapter)
+    }
+    return sum(
+        breaker.skipped
+        for adapter in adapters.values()
+        for breaker in adapter.breakers.values()
+    )
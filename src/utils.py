@@ -1,42 +1,602 @@
 """Contians upgraded functions.
 
 Logging and exception catching are added to fiunctions.
+Libraries which are slow to import are imported on first use,
+so the command line starts without them.
 """
+from __future__ import annotations
+
+import base64
+import codecs
+import hashlib
 import logging
-from typing import Dict, Pattern, Sequence, Union
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from pathlib import Path
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator,
+                    List, Mapping, Optional, Pattern, Sequence, Tuple, Type,
+                    TypeVar, Union)
+
+from backends import BACKENDS, Node, get_backend
+from configs import ForwardHandler, configure_worker_logging
+from constants import (CHARSET_PATTERN, DEFAULT_PARSE_WORKERS, DEFAULT_WORKERS,
+                       DIGEST_ALGORITHMS, DOWNLOAD_CHUNK_SIZE,
+                       PARSE_CHUNK_SIZE, PROCESS_START_METHODS,
+                       RESPONSES_ENCODING, THROTTLE_STATUSES, ParserBackend)
+from profiler import PROFILER
+
+if TYPE_CHECKING:
+    from bs4 import SoupStrainer
+    from lxml import etree
+    from requests import Response
+    from requests_cache import CachedResponse, CachedSession, OriginalResponse
+
+T = TypeVar('T')
+R = TypeVar('R')
 
-from bs4 import NavigableString, Tag
-from requests import RequestException
-from requests_cache import CachedResponse, CachedSession, OriginalResponse
 
-from constants import RESPONSES_ENCODING
-from exceptions import ParserFindTagException
+def get_declared_encoding(headers: Mapping[str, str]) -> str:
+    """
+    Get charset declared in Content-Type of response.
+
+    Pages which don't declare it or declare an unknown one
+    are read as utf-8.
+    """
+    declared = re.search(
+        CHARSET_PATTERN, headers.get('Content-Type', ''), re.IGNORECASE,
+    )
+    if declared is None:
+        return RESPONSES_ENCODING
+    try:
+        codecs.lookup(declared.group(1))
+    except LookupError:
+        return RESPONSES_ENCODING
+    return declared.group(1)
+
+
+def is_throttled(response: Response, url: str) -> bool:
+    """Check if the server still limits requests after retries."""
+    if response.status_code not in THROTTLE_STATUSES:
+        return False
+    logging.error(
+        f'Сервер ограничил запросы ({response.status_code}), '
+        f'страница не загружена после повторов: {url}',
+    )
+    return True
 
 
 def get_response(
     session: CachedSession, url: Sequence[str],
 ) -> Union[OriginalResponse, CachedResponse]:
     """Add check if page loading error is catched and logging."""
+    from requests import RequestException
+
+    from exceptions import CircuitOpenError
+
+    start = time.perf_counter()
     try:
         response = session.get(str(url))
-        response.encoding = RESPONSES_ENCODING
+        if is_throttled(response, url):
+            return None
+        response.encoding = get_declared_encoding(response.headers)
+        if PROFILER.enabled:
+            PROFILER.record_response(
+                str(url),
+                time.perf_counter() - start,
+                getattr(response, 'from_cache', False),
+                len(response.content),
+            )
+        return response
+    except CircuitOpenError:
+        return None
+    except RequestException:
+        logging.exception(
+            f'Возникла ошибка при загрузке страницы {url}',
+        )
+
+
+def get_uncached_response(
+    session: CachedSession,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
+    method: str = 'GET',
+) -> Optional[Response]:
+    """Load page bypassing the responses cache of the session."""
+    from requests import Request, RequestException, Session
+
+    from exceptions import CircuitOpenError
+
+    start = time.perf_counter()
+    try:
+        request = session.prepare_request(
+            Request(method, str(url), headers=headers),
+        )
+        settings = session.merge_environment_settings(
+            request.url, {}, stream, None, None,
+        )
+        response = Session.send(session, request, **settings)
+        if is_throttled(response, url):
+            response.close()
+            return None
+        response.encoding = get_declared_encoding(response.headers)
+        if PROFILER.enabled:
+            PROFILER.record_response(
+                str(url),
+                time.perf_counter() - start,
+                False,
+                0 if stream else len(response.content),
+            )
         return response
+    except CircuitOpenError:
+        return None
     except RequestException:
         logging.exception(
             f'Возникла ошибка при загрузке страницы {url}',
-            stack_info=True,
         )
 
 
+def get_cached_response(
+    session: CachedSession, url: str,
+) -> Optional[CachedResponse]:
+    """
+    Get fresh response from the responses cache, None if there isn't.
+
+    Cache answers 504 to requests of pages which aren't cached.
+    """
+    start = time.perf_counter()
+    response = session.get(str(url), only_if_cached=True)
+    if (
+        response.status_code == HTTPStatus.GATEWAY_TIMEOUT
+        or response.is_expired
+    ):
+        return None
+    response.encoding = get_declared_encoding(response.headers)
+    if PROFILER.enabled:
+        PROFILER.record_response(
+            str(url),
+            time.perf_counter() - start,
+            True,
+            len(response.content),
+        )
+    return response
+
+
+def get_conditional_response(
+    session: CachedSession,
+    url: str,
+    validators: Optional[Dict[str, str]] = None,
+) -> Optional[Response]:
+    """
+    Load page if it has been changed since validators were saved.
+
+    Server answers 304 Not Modified without body for unchanged page.
+    """
+    headers = {}
+    if validators and validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators and validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return get_uncached_response(session, url, headers=headers)
+
+
+def get_expected_checksum(
+    headers: Mapping[str, str],
+) -> Optional[Tuple[str, str]]:
+    """
+    Get checksum of file declared by server as (algorithm, hexdigest).
+
+    Digest and Content-MD5 headers are used, ETag only if it is md5.
+    """
+    for digest in headers.get('Digest', '').split(','):
+        name, _, value = digest.strip().partition('=')
+        algorithm = DIGEST_ALGORITHMS.get(name.lower())
+        if algorithm and value:
+            return algorithm, base64.b64decode(value).hex()
+    if headers.get('Content-MD5'):
+        return 'md5', base64.b64decode(headers['Content-MD5']).hex()
+    etag = headers.get('ETag', '').strip('"').lower()
+    if re.fullmatch(r'[0-9a-f]{32}', etag):
+        return 'md5', etag
+    return None
+
+
+def get_file_checksum(filepath: Path, algorithm: str) -> str:
+    """Count checksum of file reading it by chunks."""
+    file_hash = hashlib.new(algorithm)
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def is_file_complete(
+    filepath: Path,
+    size: Optional[int],
+    checksum: Optional[Tuple[str, str]],
+) -> bool:
+    """Check size and checksum of file if they are known."""
+    if not filepath.exists():
+        return False
+    if size is not None and filepath.stat().st_size != size:
+        return False
+    if checksum is None:
+        return True
+    algorithm, hexdigest = checksum
+    return get_file_checksum(filepath, algorithm) == hexdigest
+
+
+def get_validator(headers: Mapping[str, str]) -> Optional[str]:
+    """Get strong ETag or Last-Modified which identify version of file."""
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+def get_range_start(headers: Mapping[str, str]) -> Optional[int]:
+    """Get first byte of the part of file sent in Content-Range."""
+    content_range = re.match(
+        r'bytes (\d+)-', headers.get('Content-Range', ''),
+    )
+    return int(content_range.group(1)) if content_range else None
+
+
+def stream_to_file(
+    session: CachedSession, url: str, part_path: Path,
+) -> bool:
+    """
+    Stream file by chunks appending to the partial file if it exists.
+
+    Validator of the file version the part belongs to is kept next to it
+    and sent in If-Range, so a changed file is sent whole. Partial file
+    is loaded again if there is no validator or the part sent by server
+    doesn't start at its end. Part which is already whole is answered
+    416 and kept as it is.
+    """
+    validator_path = part_path.with_name(part_path.name + '.validator')
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = None
+    if offset and validator_path.exists():
+        headers = {
+            'Range': f'bytes={offset}-',
+            'If-Range': validator_path.read_text(),
+        }
+    response = get_uncached_response(session, url, headers, stream=True)
+    if response is None:
+        return False
+    with response:
+        if (
+            headers is not None and response.status_code
+            == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        ):
+            return True
+        if response.status_code not in (
+            HTTPStatus.OK, HTTPStatus.PARTIAL_CONTENT,
+        ):
+            remove_part(part_path)
+            logging.error(
+                f'Сервер вернул статус {response.status_code} для {url}',
+            )
+            return False
+        resumed = (
+            headers is not None
+            and response.status_code == HTTPStatus.PARTIAL_CONTENT
+        )
+        if not resumed or get_range_start(response.headers) == offset:
+            write_part(response, part_path, resumed)
+            return True
+    logging.warning(
+        f'Сервер прислал не ту часть файла, файл будет загружен заново: {url}',
+    )
+    remove_part(part_path)
+    return stream_to_file(session, url, part_path)
+
+
+def write_part(response: Response, part_path: Path, resumed: bool) -> None:
+    """Write body of response to the part, keep validator of new part."""
+    validator_path = part_path.with_name(part_path.name + '.validator')
+    if not resumed:
+        validator = get_validator(response.headers)
+        if validator is None:
+            validator_path.unlink(missing_ok=True)
+        else:
+            validator_path.write_text(validator)
+    with open(part_path, 'ab' if resumed else 'wb') as file:
+        for chunk in iter_chunks(response, DOWNLOAD_CHUNK_SIZE):
+            file.write(chunk)
+
+
+def remove_part(part_path: Path) -> None:
+    """Remove partial file with validator of its version."""
+    part_path.unlink(missing_ok=True)
+    part_path.with_name(part_path.name + '.validator').unlink(
+        missing_ok=True,
+    )
+
+
+def iter_chunks(response: Response, chunk_size: int) -> Iterator[bytes]:
+    """Read body of streamed response by chunks counting received bytes."""
+    for chunk in response.iter_content(chunk_size):
+        if PROFILER.enabled:
+            PROFILER.record_bytes(len(chunk))
+        yield chunk
+
+
+def download_file(
+    session: CachedSession, url: str, filepath: Path,
+) -> bool:
+    """
+    Stream file to disk by chunks bypassing the responses cache.
+
+    Download is skipped if the file matches size and checksum declared
+    by server. A partial file left by the previous run is resumed with
+    Range request if the version of file it belongs to is known.
+    File appears under its name only when it is complete.
+    """
+    head = get_uncached_response(session, url, method='HEAD')
+    if head is None:
+        return False
+    size = head.headers.get('Content-Length')
+    size = int(size) if size and size.isdigit() else None
+    checksum = get_expected_checksum(head.headers)
+    if checksum is not None and is_file_complete(filepath, size, checksum):
+        logging.info(f'Файл уже загружен, загрузка пропущена: {filepath}')
+        return False
+
+    part_path = filepath.with_name(filepath.name + '.part')
+    part_complete = (
+        checksum is not None
+        and is_file_complete(part_path, size, checksum)
+    )
+    if not part_complete and not stream_to_file(session, url, part_path):
+        return False
+    if not is_file_complete(part_path, size, checksum):
+        remove_part(part_path)
+        logging.error(f'Файл загружен с ошибкой и удалён: {url}')
+        return False
+    os.replace(part_path, filepath)
+    remove_part(part_path)
+    return True
+
+
+def bounded_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = DEFAULT_WORKERS,
+    executor_class: Type[Executor] = ThreadPoolExecutor,
+) -> Iterator[R]:
+    """Apply func to items in a pool keeping the order of items.
+
+    Only a limited window of tasks is submitted at once,
+    so items are consumed lazily. Process pool needs picklable func.
+    """
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    with executor_class(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def process_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = DEFAULT_PARSE_WORKERS,
+) -> Iterator[R]:
+    """Apply picklable func to items in a pool of processes keeping the order.
+
+    Items are mapped in the current process if a single worker is chosen,
+    then multiprocessing isn't even imported.
+    """
+    if workers <= 1:
+        return map(func, items)
+    return pool_map(func, items, workers)
+
+
+def start_worker(log_queue: Any, level: int, profile: bool) -> None:
+    """Send records of worker to the main process, enable its profiler."""
+    configure_worker_logging(log_queue, level)
+    PROFILER.enabled = profile
+
+
+def call_profiled(func: Callable[[T], R], item: T) -> Tuple[R, Dict]:
+    """Call func in worker and return stages it has recorded with result."""
+    return func(item), PROFILER.take_stages()
+
+
+def pool_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = DEFAULT_PARSE_WORKERS,
+) -> Iterator[R]:
+    """
+    Apply func to items in processes started without forking this one.
+
+    Threads of the main process aren't forked into the workers.
+    Records logged by workers are sent through a queue to the loggers
+    of the main process, stages profiled by workers are merged
+    into the profile of the main process.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from logging.handlers import QueueListener
+
+    context = multiprocessing.get_context(next(
+        method for method in PROCESS_START_METHODS
+        if method in multiprocessing.get_all_start_methods()
+    ))
+    log_queue = context.Queue()
+    listener = QueueListener(log_queue, ForwardHandler())
+    listener.start()
+    profile = PROFILER.enabled
+    try:
+        results = bounded_map(
+            partial(call_profiled, func) if profile else func,
+            items,
+            workers,
+            partial(
+                ProcessPoolExecutor,
+                mp_context=context,
+                initializer=start_worker,
+                initargs=(log_queue, logging.root.level, profile),
+            ),
+        )
+        if not profile:
+            yield from results
+            return
+        for result, stages in results:
+            PROFILER.merge_stages(stages)
+            yield result
+    finally:
+        listener.stop()
+        log_queue.close()
+
+
+def show_progress(
+    items: Iterable[T], total: Optional[int] = None,
+) -> Iterator[T]:
+    """
+    Show progress bar of items in console while they are consumed.
+
+    Without total only the number of items passed is shown.
+    """
+    from tqdm import tqdm
+
+    return iter(tqdm(items, total=total))
+
+
+def get_responses(
+    session: CachedSession,
+    urls: Iterable[str],
+    workers: int = DEFAULT_WORKERS,
+    loader: Callable[
+        [CachedSession, str], Optional[Response],
+    ] = get_response,
+) -> Iterator[Optional[Response]]:
+    """
+    Load pages concurrently, responses are yielded in the urls order.
+
+    Threads share the session, so they read from and save to the same
+    responses cache.
+    """
+    return bounded_map(lambda url: loader(session, url), urls, workers)
+
+
+def parse_page(
+    markup: Union[str, bytes],
+    backend: str = ParserBackend.SOUP,
+    parse_only: Optional[SoupStrainer] = None,
+    encoding: Optional[str] = None,
+) -> Node:
+    """
+    Build the tree of page with the chosen backend.
+
+    Body of response is parsed as bytes in its declared encoding,
+    so it isn't decoded to a string first.
+    """
+    with PROFILER.measure('parse'):
+        return BACKENDS[backend].parse(markup, parse_only, encoding)
+
+
+def iter_page_events(
+    content: Union[bytes, Iterable[bytes]],
+    encoding: Optional[str] = None,
+    chunk_size: int = PARSE_CHUNK_SIZE,
+) -> Iterator[Tuple[str, etree._Element]]:
+    """
+    Parse page by chunks, yield start and end events of its tags.
+
+    Body is split into chunks, chunks of a streamed response are parsed
+    as they come, the rest of them isn't read if reader stops early.
+    The tree grows while events are read, so readers should release
+    elements they have read with release_element.
+    """
+    from lxml import etree, html
+
+    chunks = content
+    if isinstance(content, bytes):
+        chunks = (
+            content[start:start + chunk_size]
+            for start in range(0, len(content), chunk_size)
+        )
+    parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+    parser.set_element_class_lookup(html.HtmlElementClassLookup())
+    for chunk in chunks:
+        with PROFILER.measure('parse'):
+            parser.feed(chunk)
+        yield from parser.read_events()
+    with PROFILER.measure('parse'):
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            return  # page without tags
+    yield from parser.read_events()
+
+
+def release_element(element: etree._Element) -> None:
+    """Drop element read from page events and its siblings read before."""
+    element.clear()
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+
+def release_tree(tree: Node) -> None:
+    """Free the tree of page as soon as values are taken from it."""
+    get_backend(tree).release(tree)
+
+
 def find_tag(
-    soup: Union[Tag, NavigableString, int],
+    soup: Node,
     tag: str,
     attrs: Union[Dict[str, str], Dict[str, Pattern[str]], None] = None,
-) -> Union[Tag, NavigableString, int]:
+) -> Node:
     """Add check if tag hasn't been found and logging."""
-    searched_tag = soup.find(tag, attrs=(attrs or {}))
+    with PROFILER.measure('find_tag'):
+        searched_tag = get_backend(soup).find(soup, tag, attrs)
     if searched_tag is None:
-        error_msg = f'Не найден тег {tag} {attrs}'
-        logging.error(error_msg, stack_info=True)
-        raise ParserFindTagException(error_msg)
+        raise tag_not_found(tag, attrs)
     return searched_tag
+
+
+def tag_not_found(
+    tag: str,
+    attrs: Union[Dict[str, str], Dict[str, Pattern[str]], None] = None,
+) -> Exception:
+    """Log that tag hasn't been found, give exception to raise."""
+    from exceptions import ParserFindTagException
+
+    error_msg = f'Не найден тег {tag} {attrs}'
+    logging.error(error_msg)
+    return ParserFindTagException(error_msg)
+
+
+def find_all_tags(
+    soup: Node,
+    tag: str,
+    attrs: Union[Dict[str, str], Dict[str, Pattern[str]], None] = None,
+) -> List[Node]:
+    """Find all tags in the tree of any backend."""
+    with PROFILER.measure('find_all'):
+        return get_backend(soup).find_all(soup, tag, attrs)
+
+
+def get_text(tag: Node) -> str:
+    """Get text of the tag from the tree of any backend."""
+    return get_backend(tag).text(tag)
+
+
+def get_attr(tag: Node, name: str) -> str:
+    """Get attribute of the tag from the tree of any backend."""
+    return get_backend(tag).attr(tag, name)
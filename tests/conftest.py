@@ -1,5 +1,9 @@
 import pytest
 import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from bs4 import BeautifulSoup
 import requests_mock
@@ -27,6 +31,83 @@ except (ImportError, ModuleNotFoundError, NameError):
         assert file in src_dir_files, f'Отсутсвует файл {file}'
 
 
+class LocalServer:
+    """Serve `pages` on localhost and count requests by path.
+
+    Requests beyond `max_in_flight` concurrent ones are answered 429.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.hits = {}
+        self.delay = 0.0
+        self.max_in_flight = None
+        self.in_flight = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    server.in_flight += 1
+                    rejected = (
+                        server.max_in_flight is not None
+                        and server.in_flight > server.max_in_flight
+                    )
+                    server.throttled += rejected
+                try:
+                    if rejected:
+                        self.send_response(429)
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    time.sleep(server.delay)
+                    self.send_page()
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def send_page(self):
+                server.hits[self.path] = server.hits.get(self.path, 0) + 1
+                body = server.pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                body = body.encode('utf-8')
+                etag = f'"{zlib.crc32(body)}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/'
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def local_server():
+    with LocalServer() as server:
+        yield server
+
+
 def pytest_make_parametrize_id(config, val):
     return repr(val)
 
@@ -0,0 +1,80 @@
+import gc
+import re
+
+import pytest
+try:
+    from src import backends, utils
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `backends.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `backends.py`'
+
+PAGE = (
+    '<html><body><div class="sphinxsidebarwrapper">'
+    '<ul><li class="toctree-l1"><a href="3.12.html">Python 3.12</a></li>'
+    '<li class="toctree-l2 current"><a href="3.11.html">Python <em>3.11'
+    '</em></a></li></ul>'
+    '<table class="docutils align-default"><tr><td>'
+    '<a href="python-docs-pdf-letter.zip">Letter</a>'
+    '<a href="python-docs-pdf-a4.zip">A4</a></td></tr></table>'
+    '</div></body></html>'
+)
+
+
+@pytest.fixture(params=['soup', 'lxml'])
+def page(request):
+    return utils.parse_page(PAGE, request.param)
+
+
+def test_find_tag_backends(page):
+    table = utils.find_tag(page, 'table', attrs={'class': 'docutils'})
+    a_tag = utils.find_tag(
+        table, 'a', attrs={'href': re.compile(r'.+pdf-a4\.zip$')},
+    )
+    assert utils.get_attr(a_tag, 'href') == 'python-docs-pdf-a4.zip', (
+        'Функция `find_tag` должна одинаково искать теги в любом бэкенде'
+    )
+    li_tags = utils.find_all_tags(page, 'li', attrs={'class': 'toctree-l1'})
+    assert [utils.get_text(li) for li in li_tags] == ['Python 3.12']
+    assert [
+        utils.get_text(a) for a in utils.find_all_tags(page, 'a')
+    ] == ['Python 3.12', 'Python 3.11', 'Letter', 'A4']
+
+
+def test_find_tag_exception_backends(page):
+    with pytest.raises(BaseException) as excinfo:
+        utils.find_tag(page, 'unexpected')
+    assert excinfo.typename == 'ParserFindTagException', (
+        'Функция `find_tag` должна выбрасывать `ParserFindTagException` '
+        'в любом бэкенде'
+    )
+
+
+def test_get_backend():
+    assert isinstance(
+        backends.get_backend(utils.parse_page(PAGE, 'lxml')),
+        backends.LxmlBackend,
+    )
+    assert isinstance(
+        backends.get_backend(utils.parse_page(PAGE, 'soup')),
+        backends.SoupBackend,
+    )
+
+
+@pytest.mark.parametrize('backend', ['soup', 'lxml'])
+def test_release_tree(backend):
+    def collected(pages):
+        tree = utils.parse_page(PAGE * pages, backend)
+        utils.release_tree(tree)
+        del tree
+        return gc.collect()
+
+    gc.collect()
+    gc.disable()
+    try:
+        small = collected(1)
+        assert collected(100) == small, (
+            'Дерево страницы должно освобождаться без сборщика мусора'
+        )
+    finally:
+        gc.enable()
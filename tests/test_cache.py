@@ -0,0 +1,79 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+import requests_mock
+try:
+    from src import cache
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `cache.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `cache.py`'
+
+PAGES = 30
+PAGE_SIZE = 100_000
+
+
+def cached_session(backend, max_size=1):
+    session = cache.create_session(
+        SimpleNamespace(cache_backend=backend, cache_max_size=max_size),
+    )
+    adapter = requests_mock.Adapter()
+    for number in range(PAGES):
+        adapter.register_uri(
+            'GET', f'mock://docs/{number}', content=os.urandom(PAGE_SIZE),
+        )
+    session.mount('mock://', adapter)
+    return session
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'filesystem'])
+def test_lru_eviction(backend, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    session = cached_session(backend)
+    for number in range(PAGES):
+        session.get(f'mock://docs/{number}')
+    assert session.get('mock://docs/0').from_cache
+
+    evicted = session.cache.evict()
+    cached = [
+        number for number in range(PAGES)
+        if session.cache.contains(url=f'mock://docs/{number}')
+    ]
+    assert evicted == PAGES - len(cached) and len(cached) < PAGES, (
+        'Кеш больше лимита должен вытеснять ответы'
+    )
+    assert 0 in cached and PAGES - 1 in cached, (
+        'Недавно прочитанные ответы не должны вытесняться'
+    )
+    assert 1 not in cached, (
+        'Первыми должны вытесняться давно не использованные ответы'
+    )
+
+
+def test_cache_compression(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    session = cached_session('filesystem')
+    session.get_adapter('mock://').register_uri(
+        'GET', 'mock://docs/text', text='<p>Python</p>' * 10_000,
+    )
+    session.get('mock://docs/text')
+    response = session.get('mock://docs/text')
+    assert response.from_cache and response.text.count('Python') == 10_000
+    assert session.cache.responses.size() < 10_000, (
+        'Ответы в кеше должны храниться сжатыми'
+    )
+
+
+def test_cache_expiration(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    session = cache.create_session(SimpleNamespace(cache_backend='memory'))
+    policy = session.settings.urls_expire_after
+    patterns = list(policy)
+    assert patterns.index('https://peps.python.org/pep-*') < patterns.index(
+        'https://peps.python.org/',
+    ), 'Шаблон карточек PEP должен проверяться раньше индекса'
+    assert (
+        policy['https://peps.python.org/pep-*']
+        > policy['https://peps.python.org/']
+    ), 'Карточки PEP должны храниться в кеше дольше индекса'
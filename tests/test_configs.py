@@ -1,5 +1,7 @@
 import pytest
 import argparse
+import logging
+import threading
 try:
     from src import configs
 except ModuleNotFoundError:
@@ -29,7 +31,7 @@ def test_configs_file():
     ),
     (
         argparse._StoreAction, ['-o', '--output'], 'output',
-        ('pretty', 'file'),
+        ('pretty', 'file', 'gzip', 'jsonl', 'sqlite'),
         'Дополнительные способы вывода данных'
     ),
 ])
@@ -64,3 +66,45 @@ def test_configure_argument_parser(
     assert got_action.help == help_str, (
         f'Укажите help-строку cli аргумента {got_action.dest}'
     )
+
+
+@pytest.mark.parametrize('stack_level, with_stack', [
+    (None, (False, False)),
+    ('ERROR', (False, True)),
+])
+def test_start_log_listener(stack_level, with_stack):
+    class Collector(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.records = []
+            self.threads = set()
+
+        def emit(self, record):
+            self.records.append(record)
+            self.threads.add(threading.get_ident())
+
+    collector = Collector()
+    queue_handler, listener = configs.start_log_listener(
+        (collector,), stack_level,
+    )
+    logger = logging.getLogger('test_start_log_listener')
+    logger.propagate = False
+    logger.addHandler(queue_handler)
+    try:
+        logger.warning('Предупреждение %s', 1)
+        logger.error('Ошибка')
+    finally:
+        logger.removeHandler(queue_handler)
+        listener.stop()
+    assert [record.getMessage() for record in collector.records] == [
+        'Предупреждение 1', 'Ошибка',
+    ]
+    assert threading.get_ident() not in collector.threads, (
+        'Записи журнала должны писаться в отдельном потоке'
+    )
+    assert tuple(
+        record.stack_info is not None and 'test_configs.py' in record.stack_info
+        for record in collector.records
+    ) == with_stack, (
+        'Стек вызова нужно добавлять только к записям заданного уровня и выше'
+    )
@@ -0,0 +1,115 @@
+import pytest
+try:
+    from src import extractors
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `extractors.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `extractors.py`'
+
+PEP_CARD = (
+    '<html><body><h1>PEP 8 – Style Guide</h1>'
+    '<dl class="simple"><dt>Skip</dt><dd><abbr>Wrong</abbr></dd></dl>'
+    '<dl class="rfc2822 field-list simple">'
+    '<dt>Author:</dt><dd>Łukasz Langa</dd>'
+    '<dt>Status:</dt><dd><abbr title="Accepted">Active</abbr></dd>'
+    '</dl><section><dl><dd><abbr>Other</abbr></dd></dl></section>'
+    '</body></html>'
+)
+WHATS_NEW_PAGE = (
+    '<html><body><div><h1>What’s New In Python 3.12</h1>'
+    '<dl class="field-list simple">\n<dt>Editor</dt>\n'
+    '<dd><p>Adam Turner</p>\n</dd>\n</dl><h1>Other</h1><dl><dd>x</dd></dl>'
+    '</div></body></html>'
+)
+
+
+def test_parse_pep_status():
+    assert extractors.parse_pep_status(PEP_CARD) == 'Active', (
+        'Функция `parse_pep_status` должна возвращать статус '
+        'из заголовка карточки PEP'
+    )
+
+
+def test_parse_pep_status_exception():
+    with pytest.raises(BaseException) as excinfo:
+        extractors.parse_pep_status('<html><body><p>Empty</p></body></html>')
+    assert excinfo.typename == 'ParserFindTagException'
+
+
+def test_read_pep_status():
+    content = PEP_CARD.encode()
+    read = []
+
+    def chunks():
+        for start in range(0, len(content), 16):
+            read.append(start)
+            yield content[start:start + 16]
+
+    assert extractors.read_pep_status(chunks(), 'utf-8') == 'Active', (
+        'Функция `read_pep_status` должна возвращать статус '
+        'из заголовка карточки PEP'
+    )
+    assert read[-1] + 16 < len(content), (
+        'Карточку PEP нужно читать только до статуса'
+    )
+    with pytest.raises(BaseException) as excinfo:
+        extractors.read_pep_status(b'<p>Empty</p>', 'utf-8')
+    assert excinfo.typename == 'ParserFindTagException'
+
+
+def test_parse_whats_new_page():
+    got = extractors.parse_whats_new_page(WHATS_NEW_PAGE)
+    assert got == (
+        'What’s New In Python 3.12', ' Editor Adam Turner  ',
+    ), (
+        'Функция `parse_whats_new_page` должна возвращать текст первых '
+        'тегов h1 и dl статьи'
+    )
+
+
+@pytest.mark.parametrize('backend', ['soup', 'lxml'])
+@pytest.mark.parametrize('encoding', ['utf-8', 'iso-8859-2', 'cp1250'])
+def test_extract_encoded_pages(backend, encoding):
+    page = WHATS_NEW_PAGE.replace('’', "'").replace(
+        'Adam Turner', 'Łukasz Langa, Hugo van Kemenade',
+    )
+    got = extractors.extract_whats_new_page(
+        (page.encode(encoding), encoding), backend,
+    )
+    assert got == extractors.parse_whats_new_page(page, backend) == (
+        "What's New In Python 3.12",
+        ' Editor Łukasz Langa, Hugo van Kemenade  ',
+    ), (
+        'Страница должна разбираться из байтов в объявленной кодировке '
+        'так же, как из строки'
+    )
+    assert extractors.extract_pep_status(
+        (PEP_CARD.replace('–', '-').encode(encoding), encoding), backend,
+    ) == 'Active'
+
+
+def pep_index_row(number, letters):
+    return (
+        f'<tr><td><abbr title="...">{letters}</abbr></td>'
+        f'<td><a href="pep-{number:04d}/">{number}</a></td></tr>'
+    )
+
+
+def test_iter_pep_index():
+    index = (
+        '<html><body><section id="index-by-category"><table><thead>'
+        '<tr><th>Status</th><th>PEP</th></tr></thead><tbody>'
+        f'{pep_index_row(8, "PA")}</tbody></table></section>'
+        '<section id="numerical-index"><table><thead>'
+        '<tr><th>Status</th><th>PEP</th></tr></thead><tbody>'
+        f'{pep_index_row(1, "PA")}{pep_index_row(2, "SF")}'
+        '</tbody></table></section></body></html>'
+    )
+    got = list(extractors.iter_pep_index(index.encode(), 'utf-8'))
+    assert got == [('pep-0001/', 'A'), ('pep-0002/', 'F')], (
+        'Функция `iter_pep_index` должна возвращать ссылки и статусы '
+        'строк численного индекса PEP'
+    )
+    with pytest.raises(BaseException) as excinfo:
+        list(extractors.iter_pep_index(b'<p>Empty</p>', 'utf-8'))
+    assert excinfo.typename == 'ParserFindTagException'
@@ -1,5 +1,14 @@
+import gc
 import pytest
+import re
+import subprocess
+import sys
+import tracemalloc
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+
+from requests_cache import CachedSession
 try:
     from src import main
 except ModuleNotFoundError:
@@ -140,3 +149,503 @@ def test_mode_to_function():
             'В модуле `main.py` в объекте `MODE_TO_FUNCTION` '
             f'нет значения {func}'
         )
+
+
+PEP_STATUSES = [('PA', 'Active'), ('SF', 'Final'), ('S', 'Draft'),
+                ('IW', 'Withdrawn'), ('SR', 'Final')]
+
+
+@pytest.fixture
+def pep_site(mock_session):
+    pep_url = main.PEP_URL
+    mock_session.mount(pep_url, mock_session.mock_adapter)
+    rows = ''.join(
+        f'<tr><td><abbr>{letters}</abbr></td>'
+        f'<td><a href="pep-{number:04d}/">{number}</a></td></tr>'
+        for number, (letters, _) in enumerate(PEP_STATUSES)
+    )
+    mock_session.mock_adapter.register_uri(
+        'GET', pep_url,
+        text=f'<section id="numerical-index"><table><tbody>{rows}'
+             '</tbody></table></section>',
+    )
+    for number, (_, status) in enumerate(PEP_STATUSES):
+        mock_session.mock_adapter.register_uri(
+            'GET', f'{pep_url}pep-{number:04d}/',
+            text='<h1>PEP</h1><dl class="rfc2822 field-list simple">'
+                 f'<dt>Status</dt><dd><abbr>{status}</abbr></dd></dl>',
+        )
+    mock_session.mock_adapter.register_uri(
+        'GET', pep_url + 'api/peps.json',
+        json={
+            str(number): {
+                'number': number,
+                'status': status,
+                'url': f'{pep_url}pep-{number:04d}/',
+            }
+            for number, (_, status) in enumerate(PEP_STATUSES)
+        },
+    )
+    return mock_session
+
+
+def test_pep_source_index(pep_site):
+    expected = main.pep(pep_site, Namespace(workers=2, source='cards'))
+    got = main.pep(pep_site, Namespace(workers=2, source='index'))
+    assert got == expected, (
+        'Функция `pep` должна возвращать одинаковый результат '
+        'для статусов из индекса PEP и из карточек PEP'
+    )
+    assert ('Статус в карточке:', 'Final') in got, (
+        'Функция `pep` должна выводить несовпадающие статусы'
+    )
+
+
+def test_pep_source_index_missing(pep_site, caplog):
+    peps = pep_site.get(main.PEP_API_URL).json()
+    del peps['1']
+    peps['2']['url'] = peps['2']['url'].replace('https://', 'http://')
+    pep_site.mock_adapter.register_uri('GET', main.PEP_API_URL, json=peps)
+    pep_site.cache.clear()
+    calls = pep_site.mock_adapter.call_count
+    got = main.pep(pep_site, Namespace(workers=2, source='index'))
+    assert pep_site.mock_adapter.call_count == calls + 3, (
+        'По карточкам нужно собирать только статусы PEP, которых нет в индексе'
+    )
+    assert got == main.pep(pep_site, Namespace(workers=2, source='cards')), (
+        'Статусы PEP, которых нет в индексе, нужно собирать по карточкам'
+    )
+    assert 'pep-0001/' in caplog.text and 'pep-0002/' not in caplog.text, (
+        'Статусы нужно сопоставлять по номеру PEP, а отсутствующие в индексе '
+        'PEP выводить в журнал'
+    )
+
+
+def test_pep_source_index_fallback(pep_site):
+    pep_site.mock_adapter.register_uri(
+        'GET', main.PEP_API_URL, text='Not found', status_code=404,
+    )
+    got = main.pep(pep_site, Namespace(workers=2, source='index'))
+    assert got == main.pep(pep_site, Namespace(workers=2, source='cards')), (
+        'Если индекс PEP недоступен, статусы нужно собирать по карточкам'
+    )
+
+
+def test_pep_incremental_statuses(monkeypatch, tmp_path, local_server):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    for number, (_, status) in enumerate(PEP_STATUSES):
+        local_server.pages[f'/pep-{number:04d}/'] = (
+            '<dl class="rfc2822 field-list simple">'
+            f'<dd><abbr>{status}</abbr></dd></dl>'
+        )
+    pep_links = [
+        f'{local_server.url}pep-{number:04d}/'
+        for number in range(len(PEP_STATUSES))
+    ]
+    cli_args = Namespace(workers=2, incremental=True)
+    session = CachedSession(backend='memory')
+    expected = [status for _, status in PEP_STATUSES]
+
+    got = list(main.pep_incremental_statuses(session, pep_links, cli_args))
+    assert got == expected
+    assert (tmp_path / 'state' / 'pep.json').exists(), (
+        'Состояние инкрементального запуска должно сохраняться '
+        'в директории `state`'
+    )
+
+    local_server.pages['/pep-0002/'] = (
+        '<dl class="rfc2822 field-list simple"><abbr>Final</abbr></dl>'
+    )
+    parsed = []
+    monkeypatch.setattr(
+        main, 'parse_pep_status',
+        lambda markup, backend, encoding=None: (
+            parsed.append(markup) or 'Final'
+        ),
+    )
+    got = list(main.pep_incremental_statuses(session, pep_links, cli_args))
+    assert got == expected[:2] + ['Final'] + expected[3:], (
+        'Неизменившиеся карточки PEP должны брать статус из состояния'
+    )
+    assert len(parsed) == 1, (
+        'При инкрементальном запуске разбирать нужно только '
+        'изменившиеся карточки PEP'
+    )
+
+
+@pytest.mark.parametrize('source', [
+    'pep_incremental_statuses', 'pep_streamed_statuses',
+])
+def test_pep_throttled_cards(source, monkeypatch, tmp_path, local_server):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    local_server.max_in_flight = 0
+    local_server.pages['/pep-0001/'] = '<h1>PEP 1</h1>'
+    statuses = getattr(main, source)(
+        CachedSession(backend='memory'),
+        [f'{local_server.url}pep-0001/'],
+        Namespace(workers=1, incremental=True, stream_cards=True),
+    )
+    assert list(statuses) == [None], (
+        'Карточку, на которую сервер ответил 429 после повторов, '
+        'нужно пропускать, а не разбирать страницу ошибки'
+    )
+    assert local_server.throttled
+
+
+def test_pep_incremental(pep_site, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    state_path = tmp_path / 'state' / 'pep.json'
+    expected = main.pep(pep_site, Namespace(workers=2))
+    cli_args = Namespace(workers=2, incremental=True)
+    assert main.pep(pep_site, cli_args) == expected
+    assert state_path.exists(), (
+        'Режим pep с --incremental должен сохранять состояние карточек'
+    )
+    state = main.load_state(state_path)
+    assert len(state) == len(PEP_STATUSES)
+
+    for index in (1, 2):
+        main.pep(
+            pep_site,
+            Namespace(workers=2, incremental=True, shard=(index, 2)),
+        )
+    assert main.load_state(state_path) == state, (
+        'Шарды не должны перезаписывать состояние полного запуска'
+    )
+    shard_states = [
+        main.load_state(tmp_path / 'state' / f'pep_{index}_of_2.json')
+        for index in (1, 2)
+    ]
+    assert [len(shard_state) for shard_state in shard_states] == [3, 2], (
+        'Каждый шард должен хранить состояние своих карточек '
+        'в отдельном файле'
+    )
+    assert {**shard_states[0], **shard_states[1]} == state
+
+
+def test_save_state_parallel(tmp_path):
+    state_path = tmp_path / 'state' / 'pep.json'
+    states = [{'writer': writer} for writer in range(8)]
+    with ThreadPoolExecutor(8) as executor:
+        for _ in range(20):
+            list(executor.map(
+                lambda state: main.save_state(state_path, state), states,
+            ))
+    assert main.load_state(state_path) in states
+    assert [path.name for path in state_path.parent.iterdir()] == [
+        'pep.json',
+    ], 'Временные файлы состояния не должны оставаться после сохранения'
+
+
+def test_pep_parse_workers(pep_site):
+    expected = main.pep(pep_site, Namespace(workers=2, parse_workers=1))
+    got = main.pep(pep_site, Namespace(workers=2, parse_workers=2))
+    assert got == expected, (
+        'Разбор карточек PEP в пуле процессов должен давать тот же '
+        'результат в том же порядке'
+    )
+
+
+def test_pep_stream_cards(pep_site):
+    cli_args = Namespace(workers=2, stream_cards=True)
+    streamed = main.pep(pep_site, cli_args)
+    assert not pep_site.cache.contains(url=f'{main.PEP_URL}pep-0001/'), (
+        'Прочитанные не до конца карточки PEP не должны кешироваться'
+    )
+    expected = main.pep(pep_site, Namespace(workers=2))
+    assert streamed == expected, (
+        'Потоковое чтение карточек PEP должно давать тот же результат'
+    )
+    calls = pep_site.mock_adapter.call_count
+    assert main.pep(pep_site, cli_args) == expected
+    assert pep_site.mock_adapter.call_count == calls, (
+        'Карточки PEP, сохранённые в кеше целиком, нужно брать из кеша'
+    )
+
+
+def test_pep_shards(pep_site, monkeypatch, tmp_path, caplog):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    expected = main.pep(pep_site, Namespace(workers=2))
+    shard_rows = [
+        list(main.iter_pep(pep_site, Namespace(workers=2, shard=(index, 2))))
+        for index in (1, 2)
+    ]
+    assert shard_rows[0] != expected and shard_rows[1] != expected, (
+        'Шард должен проверять только свою часть строк индекса PEP'
+    )
+    assert list(main.iter_merge(pep_site)) == expected, (
+        'Объединение частичных результатов шардов должно давать '
+        'ту же таблицу, что и режим pep'
+    )
+
+    (tmp_path / 'results' / 'pep_shard_2_of_2.json').unlink()
+    assert list(main.iter_merge(pep_site)) == []
+    assert 'всех 2 шардов' in caplog.text, (
+        'Без частичных результатов всех шардов объединять их нельзя'
+    )
+
+    stale = main.load_state(tmp_path / 'results' / 'pep_shard_1_of_2.json')
+    main.save_state(
+        tmp_path / 'results' / 'pep_shard_2_of_2.json',
+        {**stale, 'index': 2, 'digest': 'yesterday'},
+    )
+    assert list(main.iter_merge(pep_site)) == [], (
+        'Частичные результаты шардов разных индексов PEP объединять нельзя'
+    )
+
+
+def test_pep_extraction_cache(pep_site, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    expected = main.pep(pep_site, Namespace(workers=2))
+    cli_args = Namespace(workers=2, extraction_cache=True)
+    assert main.pep(pep_site, cli_args) == expected
+
+    changed_body = (
+        b'<dl class="rfc2822 field-list simple"><abbr>Final</abbr></dl>'
+    )
+    pep_site.mock_adapter.register_uri(
+        'GET', f'{main.PEP_URL}pep-0002/', content=changed_body,
+    )
+    pep_site.cache.clear()
+    parsed = []
+
+    def extract_pep_status(page, backend):
+        parsed.append(page[0])
+        return 'Final'
+
+    monkeypatch.setattr(main, 'extract_pep_status', extract_pep_status)
+    main.pep(pep_site, cli_args)
+    assert parsed == [changed_body], (
+        'Заново разбирать нужно только страницы, содержимое которых '
+        'изменилось'
+    )
+
+
+@pytest.fixture
+def whats_new_site(mock_session):
+    whats_new_url = main.WHATS_NEW_URL
+    mock_session.mount(whats_new_url, mock_session.mock_adapter)
+    versions = [f'3.{minor}' for minor in range(12, 0, -1)]
+    toc = ''.join(
+        f'<li class="toctree-l1"><a href="{version}.html">{version}</a></li>'
+        for version in versions
+    )
+    mock_session.mock_adapter.register_uri(
+        'GET', whats_new_url,
+        text='<div class="sidebar"><ul><li>Contents</li></ul></div>'
+             '<section id="what-s-new-in-python">'
+             f'<div class="toctree-wrapper"><ul>{toc}</ul></div></section>',
+    )
+    for version in versions:
+        mock_session.mock_adapter.register_uri(
+            'GET', f'{whats_new_url}{version}.html',
+            text=f'<h1>What’s New In Python {version}</h1>'
+                 f'<dl><dt>Editor</dt><dd>Author {version}</dd></dl>',
+        )
+    return mock_session, versions
+
+
+def test_whats_new_order(whats_new_site):
+    session, versions = whats_new_site
+    got = main.whats_new(session, Namespace(workers=4, parse_workers=2))
+    assert got == main.whats_new(session, Namespace(workers=1)), (
+        'Параллельная загрузка статей не должна менять результат'
+    )
+    assert [link for link, _, _ in got[1:]] == [
+        f'{main.WHATS_NEW_URL}{version}.html' for version in versions
+    ], 'Статьи должны идти в порядке оглавления'
+    assert got[1][1:] == ('What’s New In Python 3.12', 'EditorAuthor 3.12')
+
+
+def test_resume(pep_site, whats_new_site, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    session, versions = whats_new_site
+    cli_args = Namespace(workers=2, checkpoint_interval=1, resume=True)
+    expected = main.pep(session, Namespace(workers=2))
+    expected_whats_new = main.whats_new(session, Namespace(workers=2))
+    load_pages = main.load_pages
+    loaded = []
+
+    def interrupted_pages(session, urls, cli_args=None):
+        urls = list(urls)
+        loaded.append(urls)
+        for number, response in enumerate(load_pages(session, urls)):
+            if number == 3:
+                raise KeyboardInterrupt
+            yield response
+
+    monkeypatch.setattr(main, 'load_pages', interrupted_pages)
+    for mode in (main.pep, main.whats_new):
+        with pytest.raises(KeyboardInterrupt):
+            mode(session, cli_args)
+    assert len(list((tmp_path / 'state').glob('checkpoint_*.json'))) == 2, (
+        'Прогресс прерванного обхода должен сохраняться в контрольной точке'
+    )
+
+    def resumed_pages(session, urls, cli_args=None):
+        urls = list(urls)
+        loaded.append(urls)
+        return load_pages(session, urls)
+
+    monkeypatch.setattr(main, 'load_pages', resumed_pages)
+    assert main.pep(session, cli_args) == expected
+    assert main.whats_new(session, cli_args) == expected_whats_new, (
+        'Продолженный обход должен давать тот же результат, что и полный'
+    )
+    assert [len(urls) for urls in loaded] == [
+        len(PEP_STATUSES), len(versions),
+        len(PEP_STATUSES) - 3, len(versions) - 3,
+    ], 'Продолженный обход не должен загружать пройденные страницы'
+    assert not list((tmp_path / 'state').glob('checkpoint_*.json')), (
+        'Контрольная точка законченного обхода должна удаляться'
+    )
+
+
+def test_run_modes(pep_site, whats_new_site, capsys):
+    blocks = []
+    for mode in ('pep', 'whats-new'):
+        main.run_modes(pep_site, Namespace(mode=[mode], output=None))
+        blocks.append(capsys.readouterr().out)
+    main.run_modes(pep_site, Namespace(
+        mode=['pep', 'whats-new', 'pep'], output=None, parallel_modes=True,
+    ))
+    got = capsys.readouterr().out
+    assert len(got) == sum(map(len, blocks)), (
+        'Каждый режим нужно запускать один раз'
+    )
+    assert all(block in got for block in blocks), (
+        'Вывод одновременно запущенных режимов не должен перемешиваться'
+    )
+
+
+DEFERRED_MODULES = (
+    'bs4', 'lxml', 'requests', 'requests_cache', 'tqdm', 'prettytable',
+    'asyncio', 'multiprocessing',
+)
+# importing `main` must take less than this share of importing the
+# libraries it defers, both are measured in the same process
+STARTUP_SHARE = 0.5
+LATEST_VERSIONS_RUN = """
+import requests, requests_mock, main
+session = requests.Session()
+adapter = requests_mock.Adapter()
+adapter.register_uri('GET', main.MAIN_DOC_URL, text=(
+    '<div class="sphinxsidebarwrapper"><ul><li>All versions</li>'
+    '<li><a href="https://docs.python.org/3.12/">Python 3.12 (stable)</a>'
+    '</li></ul></div>'
+))
+session.mount(main.MAIN_DOC_URL, adapter)
+assert len(main.latest_versions(session)) == 2
+"""
+
+
+def import_times(code):
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=Path(main.__file__).parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_startup_imports():
+    times = import_times('import main')
+    loaded = [name for name in DEFERRED_MODULES if name in times]
+    assert not loaded, (
+        'Импорт модуля `main.py` не должен загружать библиотеки '
+        f'разбора и загрузки страниц: {loaded}'
+    )
+    times = import_times('import main; import requests_cache, bs4')
+    budget = STARTUP_SHARE * (times['requests_cache'] + times['bs4'])
+    assert times['main'] < budget, (
+        f'Импорт модуля `main.py` занимает {times["main"]} мкс, '
+        f'дольше {STARTUP_SHARE:.0%} импорта отложенных библиотек'
+    )
+
+
+def test_latest_versions_imports():
+    times = import_times(LATEST_VERSIONS_RUN)
+    loaded = [
+        name for name in ('tqdm', 'prettytable', 'asyncio', 'multiprocessing')
+        if name in times
+    ]
+    assert not loaded, (
+        'Режим `latest-versions` не должен загружать '
+        f'неиспользуемые библиотеки: {loaded}'
+    )
+
+
+PEP_CARD = (
+    '<h1>PEP</h1><dl class="rfc2822 field-list simple"><dt>Status</dt>'
+    '<dd><abbr>Final</abbr></dd></dl>'
+    + '<p>Paragraph with <a href="#">link</a></p>' * 20
+)
+# bytes the peak of live memory may differ by between index sizes
+MEMORY_TOLERANCE = 16 * 1024
+
+
+def pep_memory_peak(session, peps):
+    """
+    Get peak of live memory while rows of index with peps are checked.
+
+    Cards and the index are cached before tracing, so only memory taken
+    by the run counts. A traced warm run goes first: the memory cache
+    replaces parts of the responses it returns, and the parts replaced
+    by the measured run are then freed within tracing.
+    """
+    rows = ''.join(
+        f'<tr><td><abbr>SF</abbr></td><td><a href="pep-{number:05d}/">'
+        f'{number}</a></td><td>Title of PEP {number}</td></tr>'
+        for number in range(peps)
+    )
+    session.mock_adapter.register_uri(
+        'GET', main.PEP_URL,
+        text=f'<section id="numerical-index"><table><tbody>{rows}'
+             '</tbody></table></section>',
+    )
+    session.cache.clear()
+    cli_args = Namespace(workers=1, backend='lxml')
+    check_pep_status = main.check_pep_status
+    samples = []
+
+    def sampled(pep_row, position, *args):
+        if position % 25 == 0:
+            gc.collect()
+            samples.append(tracemalloc.get_traced_memory()[0])
+        return check_pep_status(pep_row, position, *args)
+
+    main.pep(session, cli_args)
+    tracemalloc.start()
+    try:
+        main.pep(session, cli_args)
+        gc.collect()
+        baseline = tracemalloc.get_traced_memory()[0]
+        main.check_pep_status = sampled
+        main.pep(session, cli_args)
+    finally:
+        main.check_pep_status = check_pep_status
+        tracemalloc.stop()
+    return max(samples) - baseline
+
+
+def test_pep_memory(mock_session):
+    mock_session.trust_env = False
+    mock_session.mount(main.PEP_URL, mock_session.mock_adapter)
+    mock_session.mock_adapter.register_uri(
+        'GET', re.compile(re.escape(main.PEP_URL) + r'pep-\d+/'),
+        text=PEP_CARD,
+    )
+    small = pep_memory_peak(mock_session, 150)
+    large = pep_memory_peak(mock_session, 300)
+    assert abs(large - small) < MEMORY_TOLERANCE, (
+        'Пиковая память режима `pep` не должна расти с размером индекса: '
+        f'{small} Б для 150 PEP и {large} Б для 300 PEP'
+    )
@@ -1,3 +1,7 @@
+import csv
+import gzip
+import json
+import sqlite3
 from datetime import datetime
 from typing import Optional
 from pathlib import Path
@@ -90,3 +94,92 @@ def test_output_file():
     assert hasattr(outputs, 'file_output'), (
         'Напишите функцию `file_output` в модуле `output.py`'
     )
+
+
+def test_file_output_streaming(monkeypatch, tmp_path):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    seen = []
+
+    def rows():
+        yield 'Ссылка', 'Версия', 'Статус'
+        for number in range(3):
+            output_file, = (tmp_path / 'results').glob('*.csv.part')
+            seen.append(output_file.read_text(encoding='utf-8'))
+            yield f'https://docs.python.org/3.{number}/', f'3.{number}', ''
+
+    outputs.control_output(rows(), cli_args('latest-versions', 'file'))
+    assert seen[-1].count('\n') == 3 and '3.1' in seen[-1], (
+        'Строки результата нужно записывать в файл по мере получения'
+    )
+
+
+def test_control_output_empty(capsys):
+    outputs.control_output(iter(()), cli_args('pep', 'pretty'))
+    captured_out, _ = capsys.readouterr()
+    assert captured_out == '', 'Пустой результат не нужно выводить'
+
+
+PEP_ROWS = [
+    ('Статус', 'Количество'),
+    (('Active', 'Accepted'), '2'),
+    (('Final',), '1'),
+    ('Total', '3'),
+    ('Несовпадающие статусы:',),
+    ('https://peps.python.org/pep-0001/',),
+    ('Статус в карточке:', 'Final'),
+    ('Ожидаемые статусы:', ('Active', 'Accepted')),
+]
+
+
+def test_sqlite_output(monkeypatch, tmp_path):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    outputs.control_output(PEP_ROWS, cli_args('pep', 'sqlite'))
+    output_file, = (tmp_path / 'results').iterdir()
+    assert output_file.suffix == '.sqlite'
+    connection = sqlite3.connect(output_file)
+    assert connection.execute('SELECT * FROM pep_statuses').fetchall() == [
+        ('Active, Accepted', 2), ('Final', 1),
+    ], 'Количество PEP по статусам нужно сохранять в отдельной таблице'
+    assert connection.execute('SELECT * FROM pep_mismatches').fetchall() == [
+        ('https://peps.python.org/pep-0001/', 'Final', 'Active, Accepted'),
+    ], 'Несовпадающие статусы нужно сохранять в отдельной таблице'
+    connection.close()
+
+
+def test_jsonl_and_gzip_output(monkeypatch, tmp_path, records):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    rows = records('whats-new')
+    outputs.control_output(rows, cli_args('whats-new', 'jsonl'))
+    outputs.control_output(rows, cli_args('whats-new', 'gzip'))
+    jsonl_file, = (tmp_path / 'results').glob('*.jsonl')
+    lines = jsonl_file.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {'table': 'whats_new', 'link': link, 'title': title, 'editors': dl}
+        for link, title, dl in rows[1:]
+    ]
+    gzip_file, = (tmp_path / 'results').glob('*.csv.gz')
+    with gzip.open(gzip_file, 'rt', encoding='utf-8', newline='') as f:
+        assert [tuple(row) for row in csv.reader(f)] == rows
+
+
+def test_atomic_file_output(monkeypatch, tmp_path):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+
+    def rows():
+        yield 'Ссылка', 'Версия', 'Статус'
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        outputs.control_output(rows(), cli_args('latest-versions', 'file'))
+    assert list((tmp_path / 'results').iterdir()) == [], (
+        'Недописанный файл результатов не должен оставаться в `results`'
+    )
+
+
+def test_profile_summary_output(capsys):
+    outputs.profile_summary_output(['Этап', 'parse'])
+    captured_out, captured_err = capsys.readouterr()
+    assert captured_out == '', (
+        'Сводка профиля не должна смешиваться с результатами в stdout'
+    )
+    assert captured_err == 'Этап\nparse\n'
@@ -0,0 +1,62 @@
+import pytest
+try:
+    from src import utils
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `utils.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `utils.py`'
+
+
+@pytest.fixture
+def profiler():
+    utils.PROFILER.reset()
+    utils.PROFILER.enabled = True
+    yield utils.PROFILER
+    utils.PROFILER.enabled = False
+    utils.PROFILER.reset()
+
+
+def test_profiler_records_stages(profiler, mock_session):
+    url = 'mock://docs.python.org/3/'
+    mock_session.mock_adapter.register_uri(
+        'GET', url, text='<div><h1>Title</h1></div>',
+    )
+    for _ in range(2):
+        response = utils.get_response(mock_session, url)
+    soup = utils.parse_page(response.text)
+    utils.find_tag(soup, 'h1')
+
+    profile = profiler.to_dict()
+    assert profile['cache_misses'] == 1 and profile['cache_hits'] == 1, (
+        'Профиль должен учитывать попадания и промахи кеша'
+    )
+    assert profile['bytes_received'] == len('<div><h1>Title</h1></div>')
+    assert {'network', 'cache', 'parse', 'find_tag'} <= set(
+        profile['stages'],
+    ), 'Профиль должен содержать время загрузки, разбора и поиска тегов'
+    assert sum(profile['stages']['parse']['histogram'].values()) == 1
+    assert url in profile['urls']
+
+
+def test_profiler_disabled(mock_session):
+    utils.PROFILER.reset()
+    utils.get_response(mock_session, 'mock://docs.python.org/3/')
+    assert utils.PROFILER.to_dict()['stages'] == {}, (
+        'Выключенный профилировщик не должен ничего записывать'
+    )
+
+
+def test_profiler_merges_worker_stages(profiler):
+    from src import extractors
+
+    pages = [(
+        b'<dl class="rfc2822 field-list simple"><abbr>Final</abbr></dl>',
+        'utf-8',
+    )] * 3
+    assert list(
+        utils.process_map(extractors.extract_pep_status, pages, 2),
+    ) == ['Final'] * 3
+    assert profiler.to_dict()['stages']['parse']['count'] == 3, (
+        'Время разбора в процессах -p N нужно добавлять в профиль '
+        'основного процесса'
+    )
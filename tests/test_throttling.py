@@ -0,0 +1,113 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+try:
+    from src import cache, throttling, utils
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `throttling.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `throttling.py`'
+
+
+def test_throttled_server(local_server, monkeypatch):
+    monkeypatch.setattr(throttling, 'BACKOFF_BASE', 0.01)
+    local_server.delay = 0.02
+    local_server.max_in_flight = 2
+    paths = [f'/page-{number}/' for number in range(30)]
+    for path in paths:
+        local_server.pages[path] = f'<h1>{path}</h1>'
+    session = cache.create_session(SimpleNamespace(
+        cache_backend='memory', workers=8, rate_limit=1000, retries=10,
+    ))
+
+    responses = list(utils.get_responses(
+        session, [local_server.url.rstrip('/') + path for path in paths],
+        workers=8,
+    ))
+    assert [response.text for response in responses] == [
+        f'<h1>{path}</h1>' for path in paths
+    ], 'Ограниченные сервером запросы нужно повторять, не теряя страниц'
+    assert local_server.throttled, 'Сервер должен был ограничить запросы'
+    limiter = session.get_adapter(local_server.url).get_limiter(
+        local_server.url,
+    )
+    assert limiter.concurrency < 8, (
+        'После ответов 429 число параллельных запросов нужно уменьшать'
+    )
+
+
+def test_token_bucket_rate():
+    limiter = throttling.HostLimiter(rate=20, concurrency=4)
+    start = limiter.updated
+    for _ in range(11):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.updated - start >= 0.45, (
+        'Запросы к сайту не должны превышать заданную частоту'
+    )
+
+
+@pytest.mark.parametrize('headers, expected', [
+    ({'Retry-After': '3'}, 3.0),
+    ({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}, 0.0),
+    ({}, 0.0),
+])
+def test_retry_after(headers, expected):
+    assert throttling.get_retry_after(headers) == expected
+
+
+def test_backoff_jitter():
+    delays = [throttling.backoff_delay(3) for _ in range(100)]
+    assert all(
+        0 <= delay <= throttling.BACKOFF_BASE * 2**3 for delay in delays
+    )
+    assert len(set(delays)) > 1, 'Задержки повторов должны быть случайными'
+    assert throttling.backoff_delay(0, retry_after=2) >= 2
+
+
+def test_circuit_breaker(local_server):
+    local_server.pages['/'] = 'ok'
+    url = local_server.url
+    local_server.__exit__()
+    session = cache.create_session(SimpleNamespace(
+        cache_backend='memory', workers=1, breaker_threshold=3,
+    ))
+    responses = list(utils.get_responses(
+        session, [f'{url}page-{number}/' for number in range(20)], workers=1,
+    ))
+    assert responses == [None] * 20
+    breaker = session.get_adapter(url).get_breaker(url)
+    assert breaker.failures == 3 and breaker.skipped == 17, (
+        'После нескольких ошибок подряд запросы к сайту '
+        'нужно пропускать без ожидания'
+    )
+
+
+def test_stale_response_on_timeout(local_server):
+    local_server.pages['/'] = 'ok'
+    session = cache.create_session(SimpleNamespace(
+        cache_backend='memory', read_timeout=0.1,
+    ))
+    session.get(local_server.url, expire_after=1)
+    local_server.delay = 0.5
+    time.sleep(1.1)
+    response = utils.get_response(session, local_server.url)
+    assert response is not None and response.from_cache, (
+        'Если сайт не ответил вовремя, нужно использовать '
+        'устаревший ответ из кеша'
+    )
+    assert response.text == 'ok'
+
+
+def test_circuit_breaker_trial():
+    breaker = throttling.CircuitBreaker('peps.python.org', 2, 0.05)
+    breaker.record(False)
+    breaker.record(False)
+    assert not breaker.allow(), 'Цепь должна размыкаться после ошибок'
+    time.sleep(0.06)
+    assert breaker.allow() and not breaker.allow(), (
+        'После паузы к сайту пропускается один пробный запрос'
+    )
+    breaker.record(True)
+    assert breaker.allow(), 'Успешный пробный запрос должен замыкать цепь'
@@ -1,7 +1,12 @@
+import base64
+import hashlib
+import os
+
 import pytest
 import requests
 import requests_mock
 import bs4
+from requests_cache import CachedSession
 from conftest import MAIN_DOC_URL
 try:
     from src import utils
@@ -54,3 +59,223 @@ def test_get_response(mock_session):
             'делает запрос к странице и возвращает ответ. \n'
             'Кстати: You are breathtaken!'
         )
+
+
+@pytest.mark.parametrize('content_type, expected', [
+    ('text/html; charset=iso-8859-2', 'iso-8859-2'),
+    ('text/html;charset="Windows-1250"', 'Windows-1250'),
+    ('text/html', 'utf-8'),
+    ('text/html; charset=unknown-charset', 'utf-8'),
+])
+def test_get_declared_encoding(mock_session, content_type, expected):
+    url = MAIN_DOC_URL + 'encoded/'
+    with requests_mock.Mocker() as mock:
+        mock.get(
+            url,
+            content='Łukasz Langa'.encode(expected),
+            headers={'Content-Type': content_type},
+        )
+        got = utils.get_response(mock_session, url)
+    assert got.encoding == expected and got.text == 'Łukasz Langa', (
+        'Ответ нужно читать в кодировке, объявленной в Content-Type, '
+        'или в utf-8, если она не объявлена'
+    )
+
+
+def test_get_responses_keeps_order(mock_session):
+    urls = [f'mock://peps.python.org/pep-{number:04d}/' for number in range(20)]
+    for number, url in enumerate(urls):
+        mock_session.mock_adapter.register_uri('GET', url, text=str(number))
+    got = list(utils.get_responses(mock_session, urls, workers=4))
+    assert [response.text for response in got] == [
+        str(number) for number in range(20)
+    ], (
+        'Функция `get_responses` в модуле `utils.py` должна возвращать '
+        'ответы в порядке переданных ссылок'
+    )
+
+
+def test_get_responses_share_cache(local_server, tmp_path):
+    paths = [f'/pep-{number:04d}/' for number in range(30)]
+    for number, path in enumerate(paths):
+        local_server.pages[path] = f'<h1>PEP {number}</h1>'
+    urls = [local_server.url + path[1:] for path in paths]
+    cache_name = str(tmp_path / 'http_cache')
+
+    got = list(utils.get_responses(
+        CachedSession(cache_name), urls, workers=10,
+    ))
+    assert [response.text for response in got] == [
+        f'<h1>PEP {number}</h1>' for number in range(30)
+    ], 'Ответы должны возвращаться в порядке ссылок'
+
+    warm = list(utils.get_responses(
+        CachedSession(cache_name), urls, workers=10,
+    ))
+    assert all(response.from_cache for response in warm), (
+        'Параллельная загрузка должна использовать кеш ответов на диске'
+    )
+    assert set(local_server.hits.values()) == {1}, (
+        'Каждая страница должна загружаться с сервера только один раз'
+    )
+
+
+ARCHIVE = bytes(range(256)) * 1000
+ARCHIVE_URL = 'mock://docs.python.org/3/archives/python-docs-pdf-a4.zip'
+
+
+@pytest.fixture
+def archive_session(mock_session):
+    requests_log = []
+    if_range_log = []
+    archive = {
+        'content': ARCHIVE,
+        'headers': {'ETag': '"v1"'},
+        'range_start': None,
+    }
+
+    def head(request, context):
+        context.headers.update(archive['headers'])
+        context.headers['Content-Length'] = str(len(archive['content']))
+        if 'Content-MD5' not in archive['headers']:
+            context.headers['Content-MD5'] = base64.b64encode(
+                hashlib.md5(archive['content']).digest(),
+            ).decode()
+        return b''
+
+    def get(request, context):
+        requests_log.append(request.headers.get('Range'))
+        if_range_log.append(request.headers.get('If-Range'))
+        content = archive['content']
+        if not request.headers.get('Range') or (
+            request.headers.get('If-Range') not in (
+                archive['headers'].get('ETag'),
+                archive['headers'].get('Last-Modified'),
+            )
+        ):
+            return content
+        offset = int(request.headers['Range'][6:-1])
+        start = archive['range_start']
+        start = offset if start is None else start
+        context.status_code = 206
+        context.headers['Content-Range'] = (
+            f'bytes {start}-{len(content) - 1}/{len(content)}'
+        )
+        return content[start:]
+
+    mock_session.mock_adapter.register_uri('HEAD', ARCHIVE_URL, content=head)
+    mock_session.mock_adapter.register_uri('GET', ARCHIVE_URL, content=get)
+    mock_session.requests_log = requests_log
+    mock_session.if_range_log = if_range_log
+    mock_session.archive = archive
+    return mock_session
+
+
+def test_download_file(archive_session, tmp_path):
+    filepath = tmp_path / 'python-docs-pdf-a4.zip'
+    assert utils.download_file(archive_session, ARCHIVE_URL, filepath)
+    assert filepath.read_bytes() == ARCHIVE
+    assert list(tmp_path.iterdir()) == [filepath], (
+        'После загрузки не должно оставаться временных файлов'
+    )
+    assert not archive_session.cache.contains(url=ARCHIVE_URL), (
+        'Архив не должен сохраняться в кеш ответов'
+    )
+
+
+def write_part(tmp_path, content, validator=None):
+    part_path = tmp_path / 'python-docs-pdf-a4.zip.part'
+    part_path.write_bytes(content)
+    if validator is not None:
+        (tmp_path / 'python-docs-pdf-a4.zip.part.validator').write_text(
+            validator,
+        )
+
+
+def test_download_file_resume(archive_session, tmp_path):
+    filepath = tmp_path / 'python-docs-pdf-a4.zip'
+    write_part(tmp_path, ARCHIVE[:1000], '"v1"')
+    assert utils.download_file(archive_session, ARCHIVE_URL, filepath)
+    assert archive_session.requests_log == ['bytes=1000-'], (
+        'Загрузка должна продолжаться с места остановки'
+    )
+    assert archive_session.if_range_log == ['"v1"'], (
+        'Продолжение загрузки должно проверять версию файла в If-Range'
+    )
+    assert filepath.read_bytes() == ARCHIVE
+    assert list(tmp_path.iterdir()) == [filepath]
+
+
+def test_download_file_resume_changed(archive_session, tmp_path):
+    filepath = tmp_path / 'python-docs-pdf-a4.zip'
+    write_part(tmp_path, ARCHIVE[:1000], '"v1"')
+    changed = ARCHIVE[::-1]
+    archive_session.archive.update(content=changed, headers={'ETag': '"v2"'})
+    assert utils.download_file(archive_session, ARCHIVE_URL, filepath)
+    assert filepath.read_bytes() == changed, (
+        'Изменившийся на сервере файл нужно загружать целиком'
+    )
+
+
+@pytest.mark.parametrize('validator, headers', [
+    (None, {'ETag': '"v1"'}),
+    ('Wed, 21 Oct 2015', {'Last-Modified': 'Wed, 21 Oct 2015'}),
+])
+def test_download_file_no_resume(archive_session, tmp_path, validator,
+                                 headers):
+    filepath = tmp_path / 'python-docs-pdf-a4.zip'
+    write_part(tmp_path, ARCHIVE[::-1][:1000], validator)
+    archive_session.archive['headers'] = headers
+    archive_session.archive['range_start'] = 0
+    assert utils.download_file(archive_session, ARCHIVE_URL, filepath)
+    assert archive_session.requests_log[-1] is None, (
+        'Часть файла без известной версии или с неверным Content-Range '
+        'нужно загружать заново'
+    )
+    assert filepath.read_bytes() == ARCHIVE
+
+
+def test_download_file_skip(archive_session, tmp_path):
+    filepath = tmp_path / 'python-docs-pdf-a4.zip'
+    filepath.write_bytes(ARCHIVE)
+    assert not utils.download_file(archive_session, ARCHIVE_URL, filepath)
+    assert archive_session.requests_log == [], (
+        'Совпадающий с сервером файл не должен загружаться заново'
+    )
+
+
+def test_download_file_no_checksum(archive_session, tmp_path):
+    filepath = tmp_path / 'python-docs-pdf-a4.zip'
+    filepath.write_bytes(ARCHIVE[::-1])
+    archive_session.archive['headers'] = {'ETag': '"v1"', 'Content-MD5': ''}
+    assert utils.download_file(archive_session, ARCHIVE_URL, filepath)
+    assert filepath.read_bytes() == ARCHIVE, (
+        'Файл, совпадающий с сервером только размером, '
+        'нужно загружать заново'
+    )
+
+
+def test_download_file_checksum_mismatch(archive_session, tmp_path):
+    filepath = tmp_path / 'python-docs-pdf-a4.zip'
+    write_part(tmp_path, b'broken', '"v1"')
+    assert not utils.download_file(archive_session, ARCHIVE_URL, filepath)
+    assert not list(tmp_path.iterdir()), (
+        'Файл с неверной контрольной суммой должен удаляться'
+    )
+
+
+def test_process_map_logging(caplog):
+    from src import extractors
+
+    pages = [(b'<p>Empty</p>', 'utf-8')] * 2
+    with pytest.raises(BaseException) as excinfo:
+        list(utils.process_map(extractors.extract_pep_status, pages, 2))
+    assert excinfo.typename == 'ParserFindTagException'
+    assert 'Не найден тег' in caplog.text, (
+        'Записи журнала процессов разбора должны попадать '
+        'в журнал основного процесса'
+    )
+    assert all(
+        record.process != os.getpid() for record in caplog.records
+        if 'Не найден тег' in record.getMessage()
+    )